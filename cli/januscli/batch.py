@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from .util import CText
+
+cout = CText()
+
+# commands that only touch their own session or transfer and may run
+# alongside each other; anything else runs on its own, in order
+PARALLEL_CMDS = ["session", "transfer"]
+
+
+def read_commands(cmds=None, path=None):
+    '''Commands from a ";" separated string and/or a script file, in
+    order. Blank lines and lines starting with # are skipped.'''
+    lines = list()
+    if path:
+        with open(path) as f:
+            lines.extend(f.read().splitlines())
+    if cmds:
+        lines.append(cmds)
+    ret = list()
+    for l in lines:
+        if l.strip().startswith("#"):
+            continue
+        ret.extend(c.strip() for c in l.split(";") if c.strip())
+    return ret
+
+
+def _groups(lines, parallel):
+    '''Split lines into runs that may execute concurrently.'''
+    group = list()
+    for l in lines:
+        if parallel > 1 and l.split()[0] in PARALLEL_CMDS:
+            group.append(l)
+            continue
+        if group:
+            yield group
+            group = list()
+        yield [l]
+    if group:
+        yield group
+
+
+def _run(jan, line):
+    try:
+        return jan.onecmd(line)
+    except Exception as e:
+        cout.error(f"Error: {e}")
+        return False
+
+
+def run_batch(jan, lines, parallel=1):
+    '''Run commands on a JanusCmd without the interactive loop.
+    Consecutive session/transfer commands run up to parallel at a time,
+    other commands act as barriers. Stops at a command that exits.
+    Returns the number of commands that failed, i.e. returned False or
+    raised.'''
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        for group in _groups(lines, parallel):
+            if len(group) == 1:
+                cout.header(f"janus> {group[0]}")
+                ret = _run(jan, group[0])
+                if ret is True:
+                    return failed
+                failed += ret is False
+                continue
+            for l in group:
+                cout.header(f"janus> {l} &")
+            for f in [ pool.submit(_run, jan, l) for l in group ]:
+                failed += f.result() is False
+    return failed
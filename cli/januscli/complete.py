@@ -0,0 +1,37 @@
+from bisect import bisect_left, insort
+
+
+class PrefixIndex(object):
+    '''Sorted keys for tab completion. A prefix lookup is two bisects
+    plus the matches, however many keys there are.'''
+    def __init__(self, keys=()):
+        self._keys = sorted(set(str(k) for k in keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def add(self, key):
+        key = str(key)
+        if key not in self:
+            insort(self._keys, key)
+
+    def discard(self, key):
+        key = str(key)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def update(self, added=(), removed=()):
+        for k in removed:
+            self.discard(k)
+        for k in added:
+            self.add(k)
+
+    def complete(self, prefix):
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        return self._keys[lo:hi]
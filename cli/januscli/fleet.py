@@ -0,0 +1,55 @@
+import threading
+from .util import CText
+
+cout = CText()
+
+EXEC_USAGE = "usage: exec [-w <workers>] [-t <timeout>] [-s <session>] " \
+    "[-n <node>[,<node>...]] <command...>"
+EXEC_WORKERS = 8
+EXEC_TIMEOUT = 60
+
+
+def _parse(args):
+    '''(options, command) from the exec arguments.'''
+    opts = {"-w": EXEC_WORKERS, "-t": EXEC_TIMEOUT, "-s": None, "-n": None}
+    parts = args.split()
+    while parts and parts[0] in opts:
+        opt = parts.pop(0)
+        val = parts.pop(0)
+        opts[opt] = int(val) if opt == "-w" else float(val) if opt == "-t" else val
+    cmd = " ".join(parts)
+    if not cmd or not (opts["-s"] or opts["-n"]):
+        raise ValueError(args)
+    return opts, cmd
+
+
+def handle_exec(client, args, inv):
+    try:
+        opts, cmd = _parse(args)
+    except (IndexError, ValueError):
+        cout.error(EXEC_USAGE)
+        return
+    if opts["-s"] and opts["-s"] not in inv:
+        cout.error(f"Session not found: \"{opts['-s']}\"")
+        return
+    nodes = opts["-n"].split(",") if opts["-n"] else None
+
+    lock = threading.Lock()
+
+    def output(node, exec_id, text):
+        # called from the exec threads, keep each target's lines whole
+        with lock:
+            for line in text.splitlines():
+                cout.info(f"{node}| {line}")
+
+    try:
+        res = client.exec_fleet(cmd, session=opts["-s"], nodes=nodes, inventory=inv,
+                                workers=opts["-w"], timeout=opts["-t"], callback=output)
+    except Exception as e:
+        cout.error(f"Could not run command: {e}")
+        return
+    if not len(res):
+        cout.error("No matching containers")
+        return
+    cout.info(str(res))
+    return res
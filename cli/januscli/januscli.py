@@ -2,27 +2,46 @@
 
 '''
 Usage:
-janus [<url> <user> <password>]
+janus [options] [<url> <user> <password>]
+
+Options:
+  -c <commands>   Run commands separated by ";" and exit
+  -f <file>       Run commands from a file, one per line, and exit
+  --parallel <n>  Run up to <n> session/transfer commands at once [default: 1]
+  --no-snapshot   Start without the local snapshot of the last sync
+
+With -c or -f the exit status is 1 if any command failed.
 '''
 
-from docopt import docopt
 import re
 import sys
 import cmd
 import json
 import shlex
-import pprint
+import time
 import socket
-from janus_client import Client, Session, Service
+import threading
+from concurrent import futures
+from janus_client import Client, Session, ResponseCache, Inventory
 
 from .util import Util, col, CText
-from .ssh import get_pubkeys, handle_ssh
+from .ssh import get_pubkeys, handle_ssh, mux
 from .transfer import transfer, MuxTransfer
-from .service import handle_service
-
-
-SHOW_ITEMS = ["keys", "transfers"]
-SYNC_ITEMS = ["active", "nodes"]
+from .service import handle_service, SRV_ACTIONS
+from .logs import handle_logs
+from .fleet import handle_exec
+from .batch import read_commands, run_batch
+from .sync import SyncDiff, patch_list, name_key, first_key
+from .tree import PathIndex
+from .complete import PrefixIndex
+from .table import SessionTable, SessionRow, parse_opts, TABLE_USAGE
+from .snapshot import Snapshot, snapshot_path, age
+
+
+SHOW_ITEMS = ["keys", "transfers", "sync", "stats"]
+SYNC_ITEMS = ["nodes", "active", "profiles", "images"]
+# seconds a command waits for a background sync it depends on
+SYNC_WAIT = 10
 
 cout = CText()
 
@@ -37,84 +56,349 @@ class ConfigurationError(Exception):
             (self.num, self.key, self.dir)
 
 class JanusCmd(cmd.Cmd):
-    def __init__(self, url, user, passwd):
+    def __init__(self, url, user, passwd, workers=1, snapshot=None, confirm=True):
         self.prompt = "janus> "
-        self.config = {"active": list(),
-                       "nodes": dict()}
+        # ask before destructive commands; batch mode has no one to ask
+        self.confirm = confirm
+        self.config = { k: list() for k in SYNC_ITEMS }
+        # raw listing each config resource was last patched from
+        self._synced = dict()
+        # startup fetches still in flight, and how each resource last went
+        self._pending = dict()
+        self._pool = futures.ThreadPoolExecutor(max_workers=len(SYNC_ITEMS))
+        self.sync_status = { k: "not synced" for k in SYNC_ITEMS }
+        # on-disk copy of the last sync; resources loaded from it stay
+        # stale until fetched again
+        self.snapshot = snapshot
+        self._stale = set()
+        self._synced_at = dict()
+        self._saved_at = dict()
+        # typed view of config["active"], indexed by node/state/image
+        self.inventory = Inventory()
         self.cwc = self.config
         self.cwd_list = []
+        # cd/ls views of config, by path
+        self.index = PathIndex(self.config)
         self.curr = None
-        self.dtn = Client(url, auth=(user, passwd))
+        # an explicit sync should never see stale data, so only use the
+        # cache to revalidate listings (ETag/If-Modified-Since)
+        cache = ResponseCache(ttl={"nodes": 0, "profiles": 0, "images": 0})
+        self.dtn = Client(url, auth=(user, passwd), cache=cache,
+                          retry=True, breaker=True, metrics=True,
+                          pool_maxsize=max(10, workers))
+        # guards config and friends when batch mode runs commands in parallel
+        self._lock = threading.Lock()
         self.util = Util()
         self.node = None
-        self.table = None
-        self.pp = pprint.PrettyPrinter(indent=1, width=80, depth=None, stream=None)
+        # cached summary rows of the active sessions for ls
+        self.table = SessionTable()
+        self._pp = None
         self.tcount = 1
         self.xfers = dict()
+        self.xfer_keys = PrefixIndex()
         cmd.Cmd.__init__(self)
 
+    @property
+    def pp(self):
+        if self._pp is None:
+            import pprint
+            self._pp = pprint.PrettyPrinter(indent=1, width=80, depth=None, stream=None)
+        return self._pp
+
     def _cleanup(self):
         for k,v in self.xfers.items():
             v.stop()
+        self._pool.shutdown(wait=False)
+        self._save_snapshot()
+        mux.close()
+
+    def _patch(self, name, ret, items, key):
+        '''Patch config[name] in place from a listing, returning a SyncDiff.
+        A listing revalidated by the cache (304) is the same raw
+        response as last time and is not diffed at all.
+        '''
+        if self._synced.get(name) is ret._data:
+            return SyncDiff(name)
+        self._synced[name] = ret._data
+        return patch_list(self.config.setdefault(name, list()), items, key, name)
 
-    def _profiles(self, args):
+    def _update_view(self, diff):
+        if not diff:
+            return
+        self.index.apply(diff)
+        if diff.name == "active":
+            self.table.sync(self.config["active"])
+        # the cd path only needs resolving again when it is under what changed
+        if not self.cwd_list or self.cwd_list[0] == diff.name:
+            self._set_cwc()
+
+    def _fetch(self, name, args=""):
+        refresh = True if "refresh" in args else False
+        if name == "nodes":
+            return self.dtn.nodes(refresh=refresh)
+        if name == "profiles":
+            return self.dtn.profiles(refresh=refresh)
+        if name == "images":
+            return self.dtn.images()
+        return self.dtn.active()
+
+    def _apply(self, name, ret):
+        '''Patch a fetched listing (or the exception fetching it raised)
+        into config[name] and report what changed.'''
         try:
-            refresh = True if "refresh" in args else False
-            ret = self.dtn.profiles(refresh=refresh)
+            if isinstance(ret, Exception):
+                raise ret
             if ret.error():
+                self.sync_status[name] = f"error ({ret.status_code})"
                 cout.error(str(ret))
                 return
+            if name == "active":
+                # convert active sessions list into {id: session} dicts
+                items = [ {str(a['id']): a} for a in ret.json() if "id" in a ]
+                diff = self._patch(name, ret, items, first_key)
+                self._update_inventory(diff)
             else:
-                self.config["profiles"] = ret.json()
-                self._set_cwc()
-                cout.info("profiles OK")
+                diff = self._patch(name, ret, ret.json(), name_key)
+            self.sync_status[name] = "ok"
+            self._mark_synced(name)
+            self._update_view(diff)
+            cout.info(str(diff))
         except Exception as e:
+            self.sync_status[name] = f"error ({e})"
             cout.error(f"Error: {e}")
 
-    def _active(self, args):
+    def _update_inventory(self, diff):
+        byid = { first_key(d): d for d in self.config["active"] }
+        for k in diff.removed:
+            self.inventory.remove(k)
+        for k in diff.added + diff.changed:
+            self.inventory.add(dict(byid[k][k], id=k))
+
+    def _sync(self, name, args):
+        if name in self._pending:
+            # a background fetch is already on the way
+            self._ready(name)
+            return
         try:
-            if len(args):
-                self.dtn.active(args[0]).json()
-            else:
-                ret = self.dtn.active().json()
-                # convert active sessions list into dict
-                new = list()
-                for a in ret:
-                    if "id" in a:
-                        new.append({str(a['id']): a})
-                self.config["active"] = new
-            cout.info("active OK")
+            ret = self._fetch(name, args)
         except Exception as e:
-            cout.error(f"Error: {e}")
+            ret = e
+        self._apply(name, ret)
 
-    def _nodes(self, args):
+    def _active_one(self, aid):
+        '''Sync a single session into the active listing.'''
         try:
-            refresh = True if "refresh" in args else False
-            ret = self.dtn.nodes(refresh=refresh)
-            if ret.error():
+            ret = self.dtn.active(aid)
+            if ret.status_code == 404:
+                allocs = list()
+            elif ret.error():
                 cout.error(str(ret))
                 return
             else:
-                self.config["nodes"] = ret.json()
-                self._set_cwc()
-                cout.info("nodes OK")
+                data = ret.json()
+                allocs = [data] if "id" in data else \
+                    [ a for a in data.values() if "id" in a ]
+            current = self.config["active"]
+            items = [ d for d in current if first_key(d) != aid ]
+            items += [ {str(a['id']): a} for a in allocs ]
+            items.sort(key=lambda d: (len(first_key(d)), first_key(d)))
+            diff = patch_list(current, items, first_key, "active")
+            self._synced.pop("active", None)
+            if "active" not in self._stale:
+                self._synced_at["active"] = time.time()
+            self._update_inventory(diff)
+            self._update_view(diff)
+            cout.info(str(diff))
         except Exception as e:
             cout.error(f"Error: {e}")
-            #import traceback
-            #traceback.print_exc()
+
+    def sync_background(self):
+        '''Start fetching every sync resource concurrently. Results are
+        applied from the command loop as they arrive, see _apply_done().'''
+        for name in SYNC_ITEMS:
+            if name not in self._pending:
+                self.sync_status[name] = "stale, revalidating" if name in self._stale else "loading"
+                self._pending[name] = self._pool.submit(self._fetch, name)
+
+    def wait_first(self, timeout=None):
+        '''Block until at least one background fetch is done and apply it.'''
+        if self._pending:
+            futures.wait(self._pending.values(), timeout=timeout,
+                         return_when=futures.FIRST_COMPLETED)
+        self._apply_done()
+
+    def _apply_done(self):
+        for name,fut in list(self._pending.items()):
+            if not fut.done():
+                continue
+            del self._pending[name]
+            exc = fut.exception()
+            self._apply(name, exc if exc else fut.result())
+
+    def _ready(self, *names):
+        '''Wait up to SYNC_WAIT seconds for the named resources to finish
+        their background fetch. Returns False (with a warning) if any of
+        them are still loading.'''
+        pending = [ self._pending[n] for n in names if n in self._pending ]
+        if pending:
+            futures.wait(pending, timeout=SYNC_WAIT)
+            self._apply_done()
+        missing = [ n for n in names if n in self._pending ]
+        if missing:
+            cout.warn(f"Still syncing {', '.join(missing)}, try again shortly")
+            return False
+        return True
+
+    def precmd(self, line):
+        self._apply_done()
+        return line
+
+    def postcmd(self, stop, line):
+        self._save_snapshot()
+        return stop
+
+    def _mark_synced(self, name):
+        self._synced_at[name] = time.time()
+        self._stale.discard(name)
+
+    def load_snapshot(self):
+        '''Fill config from the snapshot, marking what was loaded stale.
+        Returns the names of the resources loaded.'''
+        if self.snapshot is None:
+            return []
+        try:
+            res = self.snapshot.load()
+        except OSError as e:
+            cout.warn(f"Could not read snapshot: {e}")
+            return []
+        now = time.time()
+        loaded = list()
+        for name in SYNC_ITEMS:
+            if name not in res or name in self._synced_at:
+                continue
+            synced, items = res[name]
+            key = first_key if name == "active" else name_key
+            diff = patch_list(self.config[name], items, key, name)
+            if name == "active":
+                self._update_inventory(diff)
+            self._update_view(diff)
+            self._stale.add(name)
+            self.sync_status[name] = f"stale ({age(now - synced)} old)"
+            loaded.append(f"{name} ({age(now - synced)} old)")
+        if loaded:
+            cout.info(f"Loaded snapshot: {', '.join(loaded)}")
+        return loaded
+
+    def _save_snapshot(self):
+        '''Write the resources synced since the last save, once no
+        background fetch is outstanding.'''
+        if self.snapshot is None or self._pending:
+            return
+        fresh = { n: (t, self.config[n]) for n,t in self._synced_at.items()
+                  if t > self._saved_at.get(n, 0) }
+        if not fresh:
+            return
+        try:
+            self.snapshot.save(fresh)
+        except (OSError, TypeError, ValueError) as e:
+            cout.warn(f"Could not write snapshot: {e}")
+        for n,(t,_) in fresh.items():
+            self._saved_at[n] = t
 
     def do_sync(self, args):
-        if args.startswith("nodes"):
-            self._nodes(args)
-        elif args.startswith("active"):
-            self._active(args)
-        elif args.startswith("profiles"):
-            self._profiles(args)
+        '''Fetch nodes, active sessions, profiles and images, reporting what changed
+        sync [nodes|active [<id>]|profiles|images] [refresh]'''
+        parts = args.split()
+        if parts and parts[0] == "active" and len(parts) > 1:
+            self._active_one(parts[1])
+        elif parts and parts[0] in SYNC_ITEMS:
+            self._sync(parts[0], args)
         else:
-            self._nodes(args)
-            self._active(args)
-            self._profiles(args)
-            self.do_cd("")
+            # whatever is still loading from startup is as fresh as it gets
+            loading = [ n for n in SYNC_ITEMS if n in self._pending ]
+            self._ready(*loading)
+            for name in SYNC_ITEMS:
+                if name not in loading:
+                    self._sync(name, args)
+
+    def _matches(self, keys, word, text):
+        '''Completions of word from a PrefixIndex. readline splits words on
+        characters such as "-" and "/", so only the part of each match
+        from text onwards is returned.'''
+        cut = len(word) - len(text)
+        return [ k[cut:] for k in keys.complete(word) ]
+
+    def _keys_at(self, *path):
+        try:
+            return self.index.keys(path)
+        except KeyError:
+            return PrefixIndex()
+
+    def _complete_path(self, text, l, e, dirs=False):
+        '''Complete the last segment of a config path argument, relative to
+        the cwd or absolute.'''
+        arg = l[:e].partition(" ")[2]
+        head, _, word = arg.rpartition("/")
+        parts = head.split("/") if head else []
+        base = [""] + parts if arg.startswith("/") else [""] + self.cwd_list + parts
+        try:
+            conf, path = self._conf_for_list(base)
+            keys = self.index.keys(tuple(path))
+        except (ConfigurationError, KeyError):
+            return []
+        ret = self._matches(keys, word, text)
+        if dirs:
+            cut = len(word) - len(text)
+            ret = [ k for k in ret if isinstance(conf.get(word[:cut] + k), (dict, list)) ]
+        return ret
+
+    def complete_session(self, text, l, b, e):
+        args = l[:e].split(" ")[1:]
+        word = args[-1]
+        if len(args) == 1:
+            return [ x[len(word)-len(text):] for x in SRV_ACTIONS if x.startswith(word) ]
+        if args[0] == "create":
+            # create <node>[,<node>...] <image> <profile>
+            if len(args) == 2:
+                word = word.rpartition(",")[2]
+                return self._matches(self._keys_at("nodes"), word, text)
+            if len(args) == 3:
+                return self._matches(self._keys_at("images"), word, text)
+            if len(args) == 4:
+                return self._matches(self._keys_at("profiles"), word, text)
+        elif len(args) == 2:
+            return self._matches(self._keys_at("active"), word, text)
+        return []
+
+    def complete_ssh(self, text, l, b, e):
+        args = l[:e].split(" ")[1:]
+        if len(args) != 1:
+            return []
+        return self._matches(self._keys_at(*self.cwd_list), args[0], text)
+
+    def complete_logs(self, text, l, b, e):
+        args = l[:e].split(" ")[1:]
+        pos = [ a for i,a in enumerate(args[:-1])
+                if not a.startswith("-") and (i == 0 or args[i-1] != "-n") ]
+        if len(args) > 1 and args[-2] == "-n":
+            return []
+        if not pos:
+            return self._matches(self._keys_at("active"), args[-1], text)
+        if len(pos) == 1:
+            return self._matches(self._keys_at("active", pos[0], "services"),
+                                 args[-1], text)
+        return []
+
+    def complete_rm(self, text, l, b, e):
+        args = l[:e].split(" ")[1:]
+        if len(args) == 2 and args[0] == "transfer":
+            return self._matches(self.xfer_keys, args[1], text)
+        if len(args) == 1:
+            ret = self._matches(self._keys_at(*self.cwd_list), args[0], text)
+            if "transfer".startswith(args[0]):
+                ret.append("transfer"[len(args[0])-len(text):])
+            return ret
+        return []
 
     def complete_sync(self, text, l, b, e):
         return [ x[b-5:] for x in SYNC_ITEMS if x.startswith(l[5:])]
@@ -122,13 +406,49 @@ class JanusCmd(cmd.Cmd):
     def emptyline(self):
         pass
 
+    def default(self, line):
+        super().default(line)
+        return False
+
     def do_session(self, args):
-        ret = handle_service(self.dtn, args, self.config)
-        try:
-            if ret and self.cwd_list[-1] == "active":
+        if not self._ready("active"):
+            return False
+        ret = handle_service(self.dtn, args, self.config, self.inventory, self._lock)
+        if not ret:
+            return False
+        with self._lock:
+            self.index.invalidate("active")
+            self.table.sync(self.config["active"])
+            if self.cwd_list and self.cwd_list[0] == "active":
                 self._set_cwc()
-        except:
-            pass
+
+    def do_logs(self, args):
+        '''Show container logs for a session node, -f follows new output
+        logs [-f] [-n <lines>] <session> [<node>]'''
+        if not self._ready("active"):
+            return False
+        return handle_logs(self.dtn, args, self.config)
+
+    def do_exec(self, args):
+        '''Run a command in every container of a session and/or on nodes
+        exec [-w <workers>] [-t <timeout>] [-s <session>] [-n <node>[,<node>...]] <command...>'''
+        if not self._ready("active"):
+            return False
+        res = handle_exec(self.dtn, args, self.inventory)
+        if res is None or res.failed or res.timed_out:
+            return False
+
+    def complete_exec(self, text, l, b, e):
+        args = l[:e].split(" ")[1:]
+        if len(args) < 2:
+            return []
+        word = args[-1]
+        if args[-2] == "-s":
+            return self._matches(self._keys_at("active"), word, text)
+        if args[-2] == "-n":
+            word = word.rpartition(",")[2]
+            return self._matches(self._keys_at("nodes"), word, text)
+        return []
 
     def do_ssh(self, args):
         handle_ssh(args, self.cwc)
@@ -139,38 +459,64 @@ class JanusCmd(cmd.Cmd):
         parts = args.split(" ")
         if parts[0] == "keys":
             cout.info(get_pubkeys())
+        if parts[0] == "stats":
+            self._show_stats(parts[1:])
+        if parts[0] == "sync":
+            self._show_sync()
         if parts[0] == "transfers":
-            if len(parts) < 2:
-                for k,v in self.xfers.items():
-                    cout.item(f"{k}:\t({v})")
-            elif len(parts) >= 2:
-                if parts[1] == "log":
-                    if len(parts) >= 3:
-                        try:
-                            dst = False if len(parts) == 4 and parts[3] == "src" else True
-                            cout.info(self.xfers[int(parts[2])].getlog(dst))
-                        except:
-                            import traceback
-                            traceback.print_exc()
-                            cout.info(f"Transfer not found: {parts[2]}")
-                            return
-                    else:
-                        cout.info("No transfer specified")
-                else:
+            self._show_transfers(parts)
+
+    def _show_sync(self):
+        '''How the last sync of each resource went.'''
+        for k,v in self.sync_status.items():
+            cout.item(f"{k}:\t{v}")
+
+    def _show_transfers(self, parts):
+        if len(parts) < 2:
+            for k,v in self.xfers.items():
+                cout.item(f"{k}:\t({v})")
+        elif len(parts) >= 2:
+            if parts[1] == "log":
+                if len(parts) >= 3:
                     try:
-                        cout.info(parts[1], self.xfers[parts[1]])
+                        dst = False if len(parts) == 4 and parts[3] == "src" else True
+                        cout.info(self.xfers[int(parts[2])].getlog(dst))
                     except:
-                        cout.info(f"Transfer not found: {parts[1]}")
+                        import traceback
+                        traceback.print_exc()
+                        cout.info(f"Transfer not found: {parts[2]}")
+                        return
+                else:
+                    cout.info("No transfer specified")
+            else:
+                try:
+                    cout.info(parts[1], self.xfers[parts[1]])
+                except:
+                    cout.info(f"Transfer not found: {parts[1]}")
+
+    def _show_stats(self, opts):
+        '''Controller calls per endpoint, slowest total first, as
+        Prometheus text with "prom", or cleared with "reset".'''
+        if opts and opts[0] == "prom":
+            cout.info(self.dtn.metrics.prometheus())
+        elif opts and opts[0] == "reset":
+            self.dtn.metrics.reset()
+        else:
+            cout.info(str(self.dtn.metrics))
 
     def complete_show(self, text, l, b, e):
         return [ x[b-5:] for x in SHOW_ITEMS if x.startswith(l[5:])]
 
     def do_transfer(self, args):
-        t = transfer(self.config, self.dtn, args)
+        if not self._ready("active"):
+            return False
+        t = transfer(self.config, self.dtn, args, self.inventory)
         if not t:
-            return
-        self.xfers[self.tcount] = t
-        self.tcount += 1
+            return False
+        with self._lock:
+            self.xfers[self.tcount] = t
+            self.xfer_keys.add(self.tcount)
+            self.tcount += 1
 
     def do_net(self, args):
         cout.info(args)
@@ -180,36 +526,42 @@ class JanusCmd(cmd.Cmd):
             parts = key.split(" ")
             if len(parts) < 2:
                 cout.error("Specify active transfer by number")
-                return
+                return False
             try:
                 xnum = int(parts[1])
             except:
                 cout.error("Specify active transfer by number")
-                return
+                return False
             if xnum in self.xfers:
                 cout.warn(f"Removing transfer {xnum}")
                 self.xfers[xnum].stop()
                 del self.xfers[xnum]
+                self.xfer_keys.discard(xnum)
             else:
                 cout.error(f"Transfer not found: {xnum}")
+                return False
             return
 
         if not key:
             cout.error("Specify active session by number")
-            return
+            return False
         if not len(self.cwd_list) or self.cwd_list[-1] != "active":
             cout.error("No active sessions in current path, check /active")
-            return
+            return False
         if key not in self.cwc:
             cout.error(f"{key} is not an active session")
+            return False
         else:
-            yn = self.util.query_yes_no(f"Really remove session {key}")
+            yn = not self.confirm or self.util.query_yes_no(f"Really remove session {key}")
             if yn:
                 cout.warn(f"Removing session {key}")
                 self.dtn.delete(key)
                 res = next((a for a in self.config['active'] if next(iter(a)) == key), None)
                 if res:
                     self.config['active'].remove(res)
+                self.inventory.remove(key)
+                self.index.invalidate("active", [key])
+                self.table.sync(self.config["active"])
                 self._set_cwc()
 
     def do_cd(self, path):
@@ -219,27 +571,43 @@ class JanusCmd(cmd.Cmd):
             new_wd_list = path[1:].split("/")
         else:
             new_wd_list = self.cwd_list + path.split("/")
+        top = next((p for p in new_wd_list if p), None)
+        if top in self._pending and not self._ready(top):
+            return False
         try:
             cwc, new_wd_list = self._conf_for_list(new_wd_list)
         except ConfigurationError as e:
             cout.error(str(e))
-            return
+            return False
         self.cwd_list = new_wd_list
         self.cwc = cwc
 
     def complete_cd(self, text, l, b, e):
-        return [ x[b-3:] for x,y in self.cwc.items() if x.startswith(l[3:])]
+        return self._complete_path(text, l, e)
 
     def do_ls(self, key):
         '''Show the top level of the current working config, or top level of config under [key]
-        ls [key]'''
+        ls [key]
+        In /active, or with options, show the active session table:
+        ls [--state <pat>] [--image <pat>] [--node <pat>] [--profile <pat>]
+           [--sort id|state|node|image|profile] [-r] [--page <n>] [--size <n>]'''
+        if key.startswith("-") or (not key and self.cwd_list == ["active"]):
+            try:
+                opts = parse_opts(key)
+            except ValueError:
+                cout.error(TABLE_USAGE)
+                return False
+            if not self._ready("active"):
+                return False
+            self.table.render(opts)
+            return
         conf = self.cwc
         if key:
             try:
                 conf = conf[key]
             except KeyError:
                 cout.error("No such key %s" % key)
-                return
+                return False
             self.pp.pprint(conf)
             return
 
@@ -248,38 +616,14 @@ class JanusCmd(cmd.Cmd):
             if not isinstance(conf, dict):
                 print (f"{conf}")
                 return
-            # print a nice header for the active session list
-            if len(self.cwd_list) and self.cwd_list[-1] == "active":
-                cout.header(f"{'ID': <3}: {'Status': <20}| {'Nodes/Services': <45} | {'Image': <40} | Profile")
             for k,v in conf.items():
                 scol = col.ITEM
                 if isinstance(v, dict) or isinstance(v, list):
                     if "request" in v:
-                        servcs = list()
-                        cports = list()
-                        profiles = set()
-                        images = set()
-                        err = False
-                        for s,sv in v['services'].items():
-                            for svc in sv:
-                                if svc['errors']:
-                                    err = True
-                                cports.append(svc.get('ctrl_port', 'N/A'))
-                                servcs.append(s)
-                                profiles.add(svc.get('profile', 'N/A'))
-                                images.add(svc.get('image', 'N/A'))
-                        if err:
-                            scol = col.FAIL
-                            state = f"{v['state']} (ERR)"
-                        else:
-                            state = f"{v['state']}"
-                        profs = ','.join(profiles)
-                        imgs = ','.join(images)
-                        inst = ','.join(list(map(lambda x,y: f"{x} [{y}]", servcs, cports)))
-                        disp = f"{k: <3}: {state: <20}| {inst: <45} | {imgs: <40} | {profs}"
-                    else:
-                        scol = col.DIR if len(v) else col.EDIR
-                        disp = f"{k}"
+                        cout.info(SessionRow(k, v).line)
+                        continue
+                    scol = col.DIR if len(v) else col.EDIR
+                    disp = f"{k}"
                     cout._color(scol, disp)
                 else:
                     print (f"{k}: {v}")
@@ -289,7 +633,7 @@ class JanusCmd(cmd.Cmd):
             cout.info("%s" % conf)
 
     def complete_ls(self, text, l, b, e):
-        return [ x[b-3:] for x,y in self.cwc.items() if x.startswith(l[3:]) ]
+        return self._complete_path(text, l, e)
 
     def do_lsd(self, key):
         '''Show all config from current level down... or all config under [key]
@@ -306,8 +650,7 @@ class JanusCmd(cmd.Cmd):
         self.pp.pprint(conf)
 
     def complete_lsd(self, text, l, b, e):
-        return [ x for x,y in self.cwc.iteritems()
-                 if isinstance(y, dict) and x.startswith(text) ]
+        return self._complete_path(text, l, e, dirs=True)
 
     def do_pwd(self, key):
         '''Show current path in config separated by slashes
@@ -350,48 +693,74 @@ class JanusCmd(cmd.Cmd):
         '''
         if not cwd_list:
             cwd_list = self.cwd_list
-        cwc_stack = []
-        cwc = self._ep_to_dict(self.config, None)
+        path = []
+        cwc = self.index.resolve(())
         num = 0
         for kdir in cwd_list:
             if kdir == "":
                 continue
             num += 1
-            if kdir == ".." and cwc_stack:
-                cwc = cwc_stack.pop()[0]
-                continue
-            elif kdir == "..":
+            if kdir == "..":
+                if path:
+                    path.pop()
+                    cwc = self.index.resolve(tuple(path))
                 continue
+            path.append(kdir)
             try:
-                ocwc = cwc
-                cwc = self._ep_to_dict(cwc[kdir], kdir)
-                cwc_stack.append((ocwc, kdir))
+                cwc = self.index.resolve(tuple(path))
             except KeyError:
-                #import traceback
-                #traceback.print_exc()
                 raise ConfigurationError(num, kdir, cwd_list)
-        return (cwc, [ x[1] for x in cwc_stack ])
-
-    def _ep_to_dict(self, cfg, k):
-        if k and hasattr(cfg, "json"):
-            if isinstance(cfg, Service):
-                self.active = cfg
-            cfg = cfg.json()
-
-        if isinstance(cfg, list):
-            new = {}
-            for d in cfg:
-                if "name" in d:
-                    new[d['name']] = d
-                elif type(d) is dict:
-                    for k, v in d.items():
-                        new[str(k)] = v
-                else:
-                    new[d] = None
-            cfg = new
-        return cfg
+        return (cwc, path)
+
+def batch(args, url, user, pw):
+    '''Run the -c/-f commands and exit, with status 1 if any failed.'''
+    try:
+        lines = read_commands(args.get("-c"), args.get("-f"))
+        parallel = int(args.get("--parallel"))
+    except (OSError, ValueError) as e:
+        cout.error(f"Error: {e}")
+        sys.exit(1)
+    jan = JanusCmd(url, user, pw, workers=parallel, confirm=False)
+    try:
+        jan.do_sync("")
+        failed = run_batch(jan, lines, parallel)
+    finally:
+        # running ssh sessions, e.g. of transfers, outlive the stop
+        mux.close()
+    if jan.xfers:
+        cout.warn(f"Leaving {len(jan.xfers)} transfer(s) running")
+    jan._pool.shutdown(wait=False)
+    if failed:
+        cout.error(f"{failed} command(s) failed")
+        sys.exit(1)
+
+def interactive(args, url, user, pw):
+    '''The command loop, started from the last snapshot if there is one.'''
+    snapshot = None if args.get("--no-snapshot") else Snapshot(snapshot_path(url, user))
+    jan = JanusCmd(url, user, pw, snapshot=snapshot)
+    # with a snapshot the prompt comes up straight away on the last
+    # synced state, which the background sync then revalidates
+    warm = jan.load_snapshot()
+    while True:
+        try:
+            # sync with the controller in the background, the prompt is
+            # shown as soon as the first resource is in
+            jan.sync_background()
+            if not warm:
+                jan.wait_first()
+            jan.cmdloop()
+            break
+        except KeyboardInterrupt:
+            cout.warn("Press control-c again to quit")
+            try:
+                input()
+            except KeyboardInterrupt:
+                break
+            except:
+                pass
 
 def main(args=None):
+    from docopt import docopt
     args = docopt(__doc__, version='janus cli 0.1')
     url = args.get("<url>")
     if not url:
@@ -411,21 +780,10 @@ User\t: %s
 Passwd\t: %s\n""" % (url, user, "*****" if pw != "admin" else pw)
     cout.info(info)
 
-    jan = JanusCmd(url, user, pw)
-    while True:
-        try:
-            # perform initial sync to controller at start
-            jan.do_sync("")
-            jan.cmdloop()
-            break
-        except KeyboardInterrupt:
-            cout.warn("Press control-c again to quit")
-            try:
-                input()
-            except KeyboardInterrupt:
-                break
-            except:
-                pass
+    if args.get("-c") or args.get("-f"):
+        return batch(args, url, user, pw)
+
+    interactive(args, url, user, pw)
 
 if __name__ == '__main__':
     main()
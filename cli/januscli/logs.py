@@ -0,0 +1,68 @@
+from .util import CText
+
+cout = CText()
+
+LOG_USAGE = "usage: logs [-f] [-n <lines>] <session> [<node>]"
+
+
+def _parse(args):
+    '''(follow, tail, positional args) from the logs arguments.'''
+    follow = False
+    tail = None
+    pos = list()
+    parts = args.split()
+    while parts:
+        p = parts.pop(0)
+        if p == "-f":
+            follow = True
+        elif p == "-n":
+            tail = int(parts.pop(0))
+        else:
+            pos.append(p)
+    if not pos:
+        raise ValueError(args)
+    return follow, tail, pos
+
+
+def _node(cfg, key, pos):
+    '''The node named in pos, or the session's only node.'''
+    active = cfg['active']
+    res = next((a for a in active if next(iter(a)) == key), None)
+    if not res:
+        cout.error(f"Session not found: \"{key}\"")
+        return None
+    nodes = list(res[key].get('services', {}).keys())
+    if len(pos) > 1:
+        return pos[1]
+    if len(nodes) == 1:
+        return nodes[0]
+    cout.error(f"Specify a node, session {key} has: {', '.join(nodes)}")
+    return None
+
+
+def handle_logs(client, args, cfg):
+    try:
+        follow, tail, pos = _parse(args)
+    except (IndexError, ValueError):
+        cout.error(LOG_USAGE)
+        return False
+    key = pos[0]
+    node = _node(cfg, key, pos)
+    if node is None:
+        return False
+
+    kwargs = {"stdout": 1, "stderr": 1}
+    if tail is not None:
+        kwargs["tail"] = tail
+    stream = client.stream_logs(key, node, follow=follow, **kwargs)
+    try:
+        for line in stream:
+            cout.info(line)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        cout.error(f"Could not get logs: {e}")
+        return False
+    finally:
+        stream.close()
+    return True
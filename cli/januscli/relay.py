@@ -0,0 +1,123 @@
+import os
+import tty
+import termios
+import selectors
+
+BUFSIZE = 65536
+# stop reading input while this much is still waiting to go into the pty
+MAX_PENDING = 4 * BUFSIZE
+EOF = b"\x04"
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class raw_mode(object):
+    '''Put a terminal fd in raw mode for the duration of a with block.
+    Does nothing if fd is not a terminal.'''
+    def __init__(self, fd):
+        self.fd = fd
+        self.saved = None
+
+    def __enter__(self):
+        if os.isatty(self.fd):
+            self.saved = termios.tcgetattr(self.fd)
+            tty.setraw(self.fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self.saved is not None:
+            termios.tcsetattr(self.fd, termios.TCSAFLUSH, self.saved)
+
+
+class _Closed(Exception):
+    '''The other end of the pty has gone.'''
+
+
+class _Relay(object):
+    def __init__(self, master_fd, in_fd, out_fd, bufsize):
+        self.master_fd = master_fd
+        self.in_fd = in_fd
+        self.out_fd = out_fd
+        self.bufsize = bufsize
+        self.sel = selectors.DefaultSelector()
+        self.reading = True
+        self.pending = bytearray()
+        self.sent = self.received = 0
+
+    def run(self):
+        os.set_blocking(self.master_fd, False)
+        self.sel.register(self.master_fd, selectors.EVENT_READ)
+        if self.in_fd is not None:
+            self.sel.register(self.in_fd, selectors.EVENT_READ)
+        try:
+            while True:
+                for key,events in self.sel.select():
+                    if key.fd == self.in_fd:
+                        self._input()
+                    else:
+                        self._master(events)
+                self._throttle()
+        except _Closed:
+            return self.sent, self.received
+        finally:
+            self.sel.close()
+
+    def _input(self):
+        data = os.read(self.in_fd, self.bufsize)
+        self.pending += data if data else EOF
+        if not data:
+            self.sel.unregister(self.in_fd)
+            self.in_fd = None
+
+    def _master(self, events):
+        if events & selectors.EVENT_WRITE and self.pending:
+            try:
+                n = os.write(self.master_fd, self.pending)
+            except BlockingIOError:
+                n = 0
+            except OSError:
+                raise _Closed()
+            del self.pending[:n]
+            self.sent += n
+        if events & selectors.EVENT_READ:
+            try:
+                data = os.read(self.master_fd, self.bufsize)
+            except BlockingIOError:
+                return
+            except OSError:
+                # EIO once the other end of the pty has gone
+                raise _Closed()
+            if not data:
+                raise _Closed()
+            _write_all(self.out_fd, data)
+            self.received += len(data)
+
+    def _throttle(self):
+        self.sel.modify(self.master_fd, selectors.EVENT_READ |
+                        (selectors.EVENT_WRITE if self.pending else 0))
+        if self.in_fd is None:
+            return
+        if self.reading and len(self.pending) >= MAX_PENDING:
+            self.sel.unregister(self.in_fd)
+            self.reading = False
+        elif not self.reading and len(self.pending) < MAX_PENDING:
+            self.sel.register(self.in_fd, selectors.EVENT_READ)
+            self.reading = True
+
+
+def relay(master_fd, in_fd=0, out_fd=1, bufsize=BUFSIZE):
+    '''Copy bytes between a pty master and in_fd/out_fd until the pty
+    side closes, in one thread.
+
+    Reads and writes are up to bufsize at a time. Writes into the pty are
+    non-blocking and buffered, so a process that stops reading its input
+    can never stall its output. Input is only read while less than
+    MAX_PENDING bytes are waiting. End of input is passed on as ^D; an
+    in_fd of None relays output only.
+    Returns the number of bytes relayed (to the pty, from the pty).
+    '''
+    return _Relay(master_fd, in_fd, out_fd, bufsize).run()
@@ -9,7 +9,88 @@ cout = CText()
 SRV_ACTIONS = ['create', 'start', 'stop', 'del']
 SRV_OPTIONS = {'-f': False}
 
-def handle_service(client, args, cfg):
+def _find_session(cfg, key, lock):
+    # another batch command may be adding or removing sessions right now
+    with lock:
+        return next((a for a in cfg['active'] if next(iter(a)) == key), None)
+
+def _options(parts):
+    '''The SRV_OPTIONS given after the session, for this command only.'''
+    opts = dict(SRV_OPTIONS)
+    for p in parts[2:]:
+        if p in opts:
+            opts[p] = True
+    return opts
+
+def _create(client, parts, cfg, inv, lock):
+    try:
+        instances = parts[1].split(",")
+        image = parts[2]
+        profile = parts[3]
+
+        sess = client.getSession()
+        srv = Service(instances=instances,
+                      image=image,
+                      profile=profile,
+                      username='janus',
+                      public_key=get_pubkeys())
+        sess.addService(srv)
+        ret = sess.initialize()
+    except Exception as e:
+        cout.error(f"Could not create session: {e}")
+        return False
+    if ret.error():
+        cout.error(f"Could not create session: {ret}")
+        return False
+    with lock:
+        cfg['active'].append(ret.json())
+        inv.update(ret.json())
+    sid = next(iter(ret.json()))
+    cout.warn(f"Initialized new session with id \"{sid}\"")
+    return True
+
+def _transition(op, verb, doing, key, cfg, inv, lock):
+    '''Start or stop session key with op, updating cfg and inv.'''
+    res = _find_session(cfg, key, lock)
+    if not res:
+        cout.error(f"Session not found: \"{key}\"")
+        return False
+    cout.warn(f"{doing} session \"{key}\"")
+    try:
+        ret = op(key)
+    except Exception as e:
+        cout.error(f"Could not {verb} session: {e}")
+        return False
+    if ret.error():
+        cout.error(f"Could not {verb} session: {ret}")
+        return False
+    with lock:
+        res.update(ret.json())
+        inv.update(ret.json())
+    return True
+
+def _delete(client, key, force, cfg, inv, lock):
+    res = _find_session(cfg, key, lock)
+    if not res:
+        cout.error(f"Session not found: \"{key}\"")
+        return False
+    cout.warn(f"Deleting session \"{key}\"")
+    try:
+        ret = client.delete(key, force=force)
+    except Exception as e:
+        cout.error(f"Could not delete session: {e}")
+        return False
+    if ret.error():
+        cout.error(f"Could not clear remote state: {ret}")
+        return False
+    with lock:
+        if res in cfg['active']:
+            cfg['active'].remove(res)
+        inv.remove(key)
+    return True
+
+def handle_service(client, args, cfg, inv, lock):
+    # commands may run concurrently in batch mode, lock guards cfg and inv
     if not args:
         cout.item(f"No argument, session options: {SRV_OPTIONS}")
         return
@@ -18,91 +99,14 @@ def handle_service(client, args, cfg):
         cout.error(f"Unknown service option \"{parts[0]}\"")
         return
 
-    if len(parts) > 2:
-        for p in parts:
-            if p in SRV_OPTIONS.keys():
-                SRV_OPTIONS[p] = True
-
     if parts[0] == "create":
-        try:
-            instances = parts[1].split(",")
-            image = parts[2]
-            profile = parts[3]
-
-            sess = client.getSession()
-            srv = Service(instances=instances,
-                          image=image,
-                          profile=profile,
-                          username='janus',
-                          public_key=get_pubkeys())
-            sess.addService(srv)
-            ret = sess.initialize()
-            cfg['active'].append(ret.json())
-            sid = next(iter(ret.json()))
-            cout.warn(f"Initialized new session with id \"{sid}\"")
-            return True
-        except Exception as e:
-            cout.error(f"Could not create session: {e}")
-    elif parts[0] == "start":
-        if len(parts) < 2:
-            cout.error(f"No session specified")
-            return False
-
-        try:
-            key = parts[1]
-            active = cfg['active']
-            res = next((a for a in active if next(iter(a)) == key), None)
-            if res:
-                cout.warn(f"Starting session \"{key}\"")
-            else:
-                cout.error(f"Session not found: \"{key}\"")
-                return False
-
-            ret = client.start(key)
-            res.update(ret.json())
-            return True
-        except Exception as e:
-            cout.error(f"Could not start session: {e}")
-    elif parts[0] == "stop":
-        if len(parts) < 2:
-            cout.error(f"No session specified")
-            return False
-
-        try:
-            key = parts[1]
-            active = cfg['active']
-            res = next((a for a in active if next(iter(a)) == key), None)
-            if res:
-                cout.warn(f"Stopping session \"{key}\"")
-            else:
-                cout.error(f"Session not found: \"{key}\"")
-                return False
-
-            ret = client.stop(key)
-            res.update(ret.json())
-            return True
-        except Exception as e:
-            cout.error(f"Could not stop session: {e}")
-    elif parts[0] == "del":
-        if len(parts) < 2:
-            cout.error(f"No session specified")
-            return False
-
-        try:
-            key = parts[1]
-            active = cfg['active']
-            res = next((a for a in active if next(iter(a)) == key), None)
-            if res:
-                cout.warn(f"Deleting session \"{key}\"")
-            else:
-                cout.error(f"Session not found: \"{key}\"")
-                return False
-
-            ret = client.delete(key, force=SRV_OPTIONS['-f'])
-            if ret.error():
-                cout.error(f"Could not clear remote state: {ret}")
-                return False
-            active.remove(res)
-            return True
-        except Exception as e:
-            cout.error(f"Could not delete session: {e}")
+        return _create(client, parts, cfg, inv, lock)
+    if len(parts) < 2:
+        cout.error(f"No session specified")
+        return False
+    key = parts[1]
+    if parts[0] == "start":
+        return _transition(client.start, "start", "Starting", key, cfg, inv, lock)
+    if parts[0] == "stop":
+        return _transition(client.stop, "stop", "Stopping", key, cfg, inv, lock)
+    return _delete(client, key, _options(parts)['-f'], cfg, inv, lock)
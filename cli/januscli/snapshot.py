@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# bump when the layout of the snapshot file changes
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(url, user):
+    '''One snapshot file per controller and user under the cache dir.'''
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    name = hashlib.sha1(f"{user}@{url}".encode()).hexdigest()[:16]
+    return os.path.join(base, "janus", f"{name}.json")
+
+
+def age(seconds):
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}h"
+    return f"{int(seconds // 86400)}d"
+
+
+class _Locked(object):
+    '''flock on a side file, so the snapshot itself can be swapped out
+    with os.replace while it is held.'''
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+
+    def __enter__(self):
+        self.f = open(self.path, "a")
+        if fcntl:
+            fcntl.flock(self.f, self.mode)
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+
+class Snapshot(object):
+    '''Last synced copy of the CLI config resources, shared on disk by
+    every janus instance talking to the same controller as the same user.
+
+    Each resource is stored with the time it was synced. save() merges
+    under an exclusive lock, keeping whichever copy of a resource is
+    newer, and writes a temp file that replaces the snapshot atomically,
+    so readers never see a partial file.
+    '''
+    def __init__(self, path):
+        self.path = path
+
+    def _lock(self, exclusive=False):
+        mode = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) if fcntl else None
+        return _Locked(self.path + ".lock", mode)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return dict()
+        return data.get("resources") or dict()
+
+    def load(self):
+        '''{name: (synced, items)} from the snapshot, empty if there is
+        none or it was written by an incompatible version.'''
+        if not os.path.exists(self.path):
+            return dict()
+        with self._lock():
+            res = self._read()
+        return { k: (v["synced"], v["items"]) for k,v in res.items()
+                 if isinstance(v, dict) and "synced" in v and "items" in v }
+
+    def save(self, resources):
+        '''Store {name: (synced, items)}, leaving resources another
+        instance synced more recently alone.'''
+        d = os.path.dirname(self.path)
+        os.makedirs(d, exist_ok=True)
+        with self._lock(exclusive=True):
+            res = self._read()
+            for k,(synced,items) in resources.items():
+                if synced > res.get(k, {}).get("synced", 0):
+                    res[k] = {"synced": synced, "items": items}
+            data = {"version": SNAPSHOT_VERSION, "saved": time.time(), "resources": res}
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=".snapshot-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
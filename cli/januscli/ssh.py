@@ -1,21 +1,36 @@
 import sys
 import glob
-import libtmux
-import ptyprocess
 import threading
 import signal
 from pathlib import Path
+from janus_client.sshmux import SSHMux
 from .util import Util, col
 
-
-try:
-    tmux= libtmux.Server()
-    tsess = tmux.find_where({ "session_name": "janus" })
-except:
-    tsess = None
-    print ("SSH\t: Running without tmux support")
-
-SSHCMD="ssh -t -o StrictHostKeyChecking=no -q"
+# the "janus" tmux session, looked up the first time a command needs it
+_tsess = None
+_tmux_checked = False
+_tmux_lock = threading.Lock()
+
+def tmux_session():
+    '''The "janus" tmux session, or None when running without tmux. The
+    tmux server is only contacted (and libtmux imported) on first use.'''
+    global _tsess, _tmux_checked
+    with _tmux_lock:
+        if not _tmux_checked:
+            _tmux_checked = True
+            try:
+                import libtmux
+                tmux= libtmux.Server()
+                _tsess = tmux.find_where({ "session_name": "janus" })
+            except:
+                _tsess = None
+                print ("SSH\t: Running without tmux support")
+    return _tsess
+
+SSH_FLAGS = ["-t", "-q"]
+# every ssh the CLI starts shares one master connection per container,
+# closed again by JanusCmd._cleanup()
+mux = SSHMux()
 home = str(Path.home())
 
 def get_pubkeys(path=f"{home}/.ssh"):
@@ -29,21 +44,11 @@ def get_pubkeys(path=f"{home}/.ssh"):
     return ret
 
 def ssh_pty(args, cwc):
+    import shutil
+    import ptyprocess
+    from .relay import relay, raw_mode
     user = None
 
-    def handler(signum, frame):
-        ssh.sendintr()
-
-    def output_reader(proc):
-        while True:
-            try:
-                s = proc.read()
-                sys.stdout.write(s)
-                sys.stdout.flush()
-            except EOFError:
-                proc.close()
-                break
-
     if not 'ctrl_port' in cwc or not 'ctrl_host' in cwc:
         print (col.FAIL + "No host or port information on this path" + col.ENDC)
         return
@@ -52,35 +57,32 @@ def ssh_pty(args, cwc):
     if len(parts) > 1 and parts[0] == "-l":
         user = parts[1]
     sshuser = user if user else cwc['container_user']
-    ssh = ptyprocess.PtyProcessUnicode.spawn(["ssh", "-o", "StrictHostKeyChecking=no",
-                                              cwc['ctrl_host'],
-                                              "-p", cwc['ctrl_port'],
-                                              "-l", sshuser], echo=False)
-    signal.signal(signal.SIGINT, handler)
-
-    t = threading.Thread(target=output_reader, args=(ssh,))
-    t.start()
-
-    while True:
-        try:
-            s = sys.stdin.read(1)
-            if s == '':
-                ssh.sendeof()
-            if s == '\f':
-                ssh.sendcontrol('l')
-                continue
-            if ssh.closed:
-                break
-            ssh.write(s)
-        except IOError:
-            break
-    t.join()
+    size = shutil.get_terminal_size()
+    ssh = ptyprocess.PtyProcess.spawn(mux.ssh_args(cwc['ctrl_host'],
+                                                   cwc['ctrl_port'],
+                                                   sshuser),
+                                      dimensions=(size.lines, size.columns))
+
+    def resize(signum, frame):
+        size = shutil.get_terminal_size()
+        ssh.setwinsize(size.lines, size.columns)
+
+    # the terminal is raw while connected, so ^C and friends go to the
+    # remote side as plain bytes
+    winch = signal.signal(signal.SIGWINCH, resize)
+    try:
+        sys.stdout.flush()
+        with raw_mode(sys.stdin.fileno()):
+            relay(ssh.fd, sys.stdin.fileno(), sys.stdout.fileno())
+    finally:
+        signal.signal(signal.SIGWINCH, winch)
+        ssh.close(force=True)
 
 def ssh_tmux(args, cwc):
     user = None
 
     def tpane(cmd):
-        window = tsess.attached_window
+        window = tmux_session().attached_window
         pane = window.split_window(attach=False)
         window.select_layout("even-vertical")
         pane.clear()
@@ -96,7 +98,8 @@ def ssh_tmux(args, cwc):
             for k,v in res['services'].items():
                 for s in v:
                     sshuser = user if user else s['container_user']
-                    cmd = f"{SSHCMD} {s['ctrl_host']} -p {s['ctrl_port']} -l {sshuser}"
+                    cmd = mux.ssh_command(s['ctrl_host'], s['ctrl_port'], sshuser,
+                                          flags=SSH_FLAGS)
                     tpane(cmd)
         except:
             print (col.FAIL + f"No active Session \"{args}\"" + col.ENDC)
@@ -107,26 +110,26 @@ def ssh_tmux(args, cwc):
         return
 
     sshuser = user if user else cwc['container_user']
-    cmd = f"{SSHCMD} {cwc['ctrl_host']} -p {cwc['ctrl_port']} -l {sshuser}"
+    cmd = mux.ssh_command(cwc['ctrl_host'], cwc['ctrl_port'], sshuser, flags=SSH_FLAGS)
     tpane(cmd)
 
 def handle_ssh(args, cwc):
-    if tsess:
+    if tmux_session():
         ssh_tmux(args, cwc)
     else:
         ssh_pty(args, cwc)
 
 def ssh_cmd_tmux_window(host, port, user, cmd):
     #print (host, port, user, cmd)
-    win = tsess.new_window(attach=False)
+    win = tmux_session().new_window(attach=False)
     pane = win.attached_pane
-    cmd = f"{SSHCMD} {host} -p {port} -l {user} {cmd}"
+    cmd = mux.ssh_command(host, port, user, cmd, flags=SSH_FLAGS)
     pane.send_keys(cmd)
     return pane
 
 def cmd_tmux_window(cmd):
     #print (host, port, user, cmd)
-    win = tsess.new_window(attach=False)
+    win = tmux_session().new_window(attach=False)
     pane = win.attached_pane
     pane.send_keys(cmd)
     return pane
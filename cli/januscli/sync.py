@@ -0,0 +1,65 @@
+SHOW_KEYS = 8
+
+
+def name_key(item):
+    return item.get('name') if isinstance(item, dict) else item
+
+def first_key(item):
+    return next(iter(item))
+
+
+class SyncDiff(object):
+    '''What a sync changed in one config resource, by item key.'''
+    def __init__(self, name):
+        self.name = name
+        self.added = list()
+        self.changed = list()
+        self.removed = list()
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __str__(self):
+        if not self:
+            return f"{self.name} OK (unchanged)"
+        ret = list()
+        for sym,keys in (("+", self.added), ("~", self.changed), ("-", self.removed)):
+            if not keys:
+                continue
+            shown = ", ".join(str(k) for k in keys[:SHOW_KEYS])
+            more = f" (+{len(keys) - SHOW_KEYS} more)" if len(keys) > SHOW_KEYS else ""
+            ret.append(f"  {sym} {shown}{more}")
+        counts = f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed"
+        return "\n".join([f"{self.name} OK ({counts})"] + ret)
+
+
+def patch_list(current, new, key, name):
+    '''Patch list current in place to match new and return a SyncDiff.
+
+    Items are matched by key(item). Unchanged items keep their identity
+    and changed dict items are updated in place, so references held
+    elsewhere (e.g. by session commands) stay valid.
+    '''
+    diff = SyncDiff(name)
+    old = { key(d): d for d in current }
+    merged = list()
+    seen = set()
+    for d in new:
+        k = key(d)
+        seen.add(k)
+        cur = old.get(k)
+        if cur is None:
+            diff.added.append(k)
+            merged.append(d)
+        elif cur != d:
+            diff.changed.append(k)
+            if isinstance(cur, dict):
+                cur.clear()
+                cur.update(d)
+                d = cur
+            merged.append(d)
+        else:
+            merged.append(cur)
+    diff.removed = [ k for k in old if k not in seen ]
+    current[:] = merged
+    return diff
@@ -0,0 +1,139 @@
+import sys
+import shlex
+import shutil
+from fnmatch import fnmatchcase
+from .util import col
+
+TABLE_USAGE = "usage: ls [--state <pat>] [--image <pat>] [--node <pat>] " \
+    "[--profile <pat>] [--sort id|state|node|image|profile] [-r] " \
+    "[--page <n>] [--size <n>]"
+TABLE_HEADER = f"{'ID': <3}: {'Status': <20}| {'Nodes/Services': <45} | {'Image': <40} | Profile"
+
+FILTERS = ["state", "image", "node", "profile"]
+SORT_KEYS = {
+    "id": lambda r: (len(r.id), r.id),
+    "state": lambda r: (r.state is None, r.state or ""),
+    "node": lambda r: sorted(r.nodes),
+    "image": lambda r: sorted(r.images),
+    "profile": lambda r: sorted(r.profiles),
+}
+
+
+class SessionRow(object):
+    '''The ls summary of one active session, formatted once.'''
+    __slots__ = ("id", "state", "nodes", "images", "profiles", "line", "src")
+
+    def __init__(self, key, v):
+        servcs = list()
+        cports = list()
+        profiles = set()
+        images = set()
+        err = False
+        for s,sv in v.get('services', {}).items():
+            for svc in sv:
+                if svc.get('errors'):
+                    err = True
+                cports.append(svc.get('ctrl_port', 'N/A'))
+                servcs.append(s)
+                profiles.add(svc.get('profile', 'N/A'))
+                images.add(svc.get('image', 'N/A'))
+        state = f"{v.get('state')} (ERR)" if err else f"{v.get('state')}"
+        profs = ','.join(profiles)
+        imgs = ','.join(images)
+        inst = ','.join(list(map(lambda x,y: f"{x} [{y}]", servcs, cports)))
+        disp = f"{key: <3}: {state: <20}| {inst: <45} | {imgs: <40} | {profs}"
+        self.id = key
+        self.state = v.get('state')
+        self.nodes = set(servcs)
+        self.images = images
+        self.profiles = profiles
+        self.line = (col.FAIL if err else col.ITEM) + disp + col.ENDC
+        self.src = v
+
+
+def parse_opts(args):
+    '''Parse ls table options, raising ValueError on anything unknown.'''
+    opts = {"sort": None, "reverse": False, "page": 1, "size": None}
+    parts = shlex.split(args)
+    while parts:
+        p = parts.pop(0)
+        if p == "-r":
+            opts["reverse"] = True
+            continue
+        if not p.startswith("--") or not parts:
+            raise ValueError(p)
+        name, val = p[2:], parts.pop(0)
+        if name in FILTERS:
+            opts[name] = val
+        elif name == "sort" and val in SORT_KEYS:
+            opts["sort"] = val
+        elif name in ("page", "size"):
+            opts[name] = int(val)
+        else:
+            raise ValueError(p)
+    return opts
+
+
+class SessionTable(object):
+    '''Summary rows for the active sessions, keyed by id. sync() only
+    formats rows for sessions whose data changed since the last call,
+    so listing is a filter and a join over cached strings.'''
+    def __init__(self):
+        self._rows = dict()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def sync(self, active):
+        rows = dict()
+        for d in active:
+            for k,v in d.items():
+                row = self._rows.get(k)
+                if row is None or row.src is not v:
+                    row = SessionRow(k, v)
+                rows[k] = row
+        self._rows = rows
+
+    def select(self, state=None, image=None, node=None, profile=None, **kwargs):
+        for r in self._rows.values():
+            if state and not fnmatchcase(str(r.state), state):
+                continue
+            if image and not any(fnmatchcase(i, image) for i in r.images):
+                continue
+            if node and not any(fnmatchcase(n, node) for n in r.nodes):
+                continue
+            if profile and not any(fnmatchcase(p, profile) for p in r.profiles):
+                continue
+            yield r
+
+    def render(self, opts, out=None):
+        '''Write one page of the selected rows with a single write().
+        Only terminal output is paged by default.'''
+        out = out or sys.stdout
+        rows = list(self.select(**opts))
+        if opts["sort"]:
+            rows.sort(key=SORT_KEYS[opts["sort"]], reverse=opts["reverse"])
+        elif opts["reverse"]:
+            rows.reverse()
+        size = opts["size"]
+        if not size:
+            # page to the terminal; redirected or scripted output gets
+            # every row unless --size asks otherwise
+            tty = getattr(out, "isatty", None)
+            if tty and tty():
+                size = max(10, shutil.get_terminal_size().lines - 4)
+            else:
+                size = max(1, len(rows))
+        pages = max(1, -(-len(rows) // size))
+        page = min(max(1, opts["page"]), pages)
+        lines = [col.HEADER + TABLE_HEADER + col.ENDC]
+        lines += [ r.line for r in rows[(page - 1) * size:page * size] ]
+        if not rows:
+            lines.append("No matching sessions")
+        elif pages > 1:
+            footer = f"-- page {page}/{pages}, {len(rows)} sessions"
+            if page < pages:
+                footer += f", ls --page {page + 1} for more"
+            lines.append(footer + " --")
+        out.write("\n".join(lines) + "\n")
+        out.flush()
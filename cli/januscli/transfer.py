@@ -6,18 +6,23 @@ from subprocess import PIPE, STDOUT
 from janus_client import Session, Service, NodeResponse
 from .ssh import ssh_cmd_tmux_window, cmd_tmux_window
 from .util import col
-from pygments import highlight, lexers, formatters
-
-try:
-    from zx.client import Client as zxClient
-    from zx.client import HTTPError, APIError
-    from zx.const import *
-    zx_enabled = True
-except:
-    print ("Zettar\t: Not available")
-    zx_enabled = False
-    
-SSH_TMPL = "ssh -t -o StrictHostKeyChecking=no -l {user} -p {port} {host} {cmd}"
+
+# the optional Zettar SDK is imported by _load_zx() when first needed
+zx_enabled = None
+
+def _load_zx():
+    global zx_enabled, zxClient, HTTPError, APIError, OPT_HASH, OPT_NAME, OPT_COMMENTS
+    if zx_enabled is None:
+        try:
+            from zx.client import Client as zxClient
+            from zx.client import HTTPError, APIError
+            from zx.const import OPT_HASH, OPT_NAME, OPT_COMMENTS
+            zx_enabled = True
+        except:
+            print ("Zettar\t: Not available")
+            zx_enabled = False
+    return zx_enabled
+
 
 class zxTransfer:
     site_map = {
@@ -46,6 +51,7 @@ class zxTransfer:
             zxc = self._zxc
             task = self._task
 
+        from pygments import highlight, lexers, formatters
         task = zxc.read_task(task['id'])
         jstr = json.dumps(task, sort_keys=True, indent=4)
         coljson = highlight(jstr, lexers.JsonLexer(), formatters.TerminalFormatter())
@@ -129,7 +135,7 @@ def _gridftp_xfer(sinfo, dinfo, src, dst, sfile, dfile, typ):
     return MuxTransfer(spane, dpane, src, dst, typ)
 
 def _zx_xfer(sinfo, dinfo, src, dst, sfile, dfile, typ):
-    if not zx_enabled:
+    if not _load_zx():
         print (col.FAIL + f"Transfer type \"{typ}\" not available" + col.ENDC)
         return False
 
@@ -160,8 +166,7 @@ def _zx_xfer(sinfo, dinfo, src, dst, sfile, dfile, typ):
 
     return zxTransfer(zxc, task, src, dst, typ)
     
-def transfer(cfg, client, args):
-    active = cfg['active']
+def transfer(cfg, client, args, inv):
     parts = args.split(" ")
     
     try:
@@ -174,15 +179,7 @@ def transfer(cfg, client, args):
         print (col.FAIL + "Invalid transfer specification, usage: transfer <src:path> <dst:path> <type>" + col.ENDC)
         return False
 
-    found = False
-    for a in active:
-        for k,v in a.items():
-            if src in v['allocations'] and dst in v['allocations']:
-                active = a[k]
-                found = True
-                print (col.ITEM + f"Found suitable existing session {k}" + col.ENDC)
-                break
-
+    found = inv.with_nodes(src, dst)
     if not found:
         # must allocate
         #sess = client.getSession()
@@ -202,8 +199,12 @@ def transfer(cfg, client, args):
         print (col.FAIL + "No suitable sessions found" + col.ENDC)
         return False
 
-    sinfo = active['services'][src][0]
-    dinfo = active['services'][dst][0]
+    # of several matching sessions, the one listed last is used
+    order = { next(iter(a)): i for i,a in enumerate(cfg['active']) }
+    active = max(found, key=lambda a: order.get(a.id, -1))
+    print (col.ITEM + f"Found suitable existing session {active.id}" + col.ENDC)
+    sinfo = active.services(src)[0].raw
+    dinfo = active.services(dst)[0].raw
     
     # The transfer object to return
     xfer = None
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from .complete import PrefixIndex
+
+
+def to_view(cfg):
+    '''The dict cd/ls show for a config value: lists of named items are
+    keyed by name, lists of {key: value} dicts are flattened and lists of
+    plain values become keys.'''
+    if hasattr(cfg, "json"):
+        cfg = cfg.json()
+    if isinstance(cfg, list):
+        new = {}
+        for d in cfg:
+            if "name" in d:
+                new[d['name']] = d
+            elif type(d) is dict:
+                for k, v in d.items():
+                    new[str(k)] = v
+            else:
+                new[d] = None
+        cfg = new
+    return cfg
+
+
+class PathIndex(object):
+    '''Views of the config keyed by path tuple.
+
+    A view is built from its parent the first time its path is resolved
+    and kept until invalidate() drops it, so resolving a path that has
+    been seen before is a dict lookup per segment regardless of how large
+    the config is. Views are grouped by their first two path segments
+    (e.g. ("active", "12")) so a sync only drops the items it changed.
+    '''
+    def __init__(self, config):
+        self.config = config
+        self._views = dict()
+        self._keys = dict()
+        self._groups = defaultdict(set)
+
+    def __len__(self):
+        return len(self._views)
+
+    def resolve(self, path):
+        '''The view at path (a tuple of keys), KeyError if there is none.'''
+        try:
+            return self._views[path]
+        except KeyError:
+            pass
+        if not path:
+            view = to_view(self.config)
+        else:
+            parent = self.resolve(path[:-1])
+            try:
+                view = to_view(parent[path[-1]])
+            except (KeyError, TypeError, IndexError):
+                raise KeyError(path[-1])
+        self._views[path] = view
+        self._groups[path[:2]].add(path)
+        return view
+
+    def keys(self, path):
+        '''PrefixIndex over the keys of the view at path, for completion.'''
+        ret = self._keys.get(path)
+        if ret is None:
+            view = self.resolve(path)
+            ret = PrefixIndex(view if isinstance(view, dict) else ())
+            self._keys[path] = ret
+        return ret
+
+    def apply(self, diff):
+        '''Drop the views a SyncDiff touched. The key index of the listing
+        itself is patched rather than rebuilt.'''
+        keys = self._keys.pop((diff.name,), None)
+        self.invalidate(diff.name, diff.added + diff.changed + diff.removed)
+        if keys is not None:
+            keys.update(diff.added, diff.removed)
+            self._keys[(diff.name,)] = keys
+
+    def invalidate(self, top=None, keys=None):
+        '''Drop views under top (everything if None), or only the top
+        view itself and the subtrees of keys below it.'''
+        if top is None:
+            self._views.clear()
+            self._keys.clear()
+            self._groups.clear()
+            return
+        if keys is None:
+            groups = [ g for g in self._groups if g and g[0] == top ]
+        else:
+            groups = [(top,)] + [ (top, k) for k in keys ]
+        for g in groups:
+            for path in self._groups.pop(g, ()):
+                self._views.pop(path, None)
+                self._keys.pop(path, None)
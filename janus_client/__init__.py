@@ -1 +1,16 @@
-from .client import Client,Session,Service,NodeResponse
+from .client import Client,Session,Service,NodeResponse,SessOpResponse,SessionError,set_decoder
+from .cache import ResponseCache
+from .retry import RetryPolicy,CircuitBreaker,CircuitOpenError
+from .wait import ExecResult
+from .model import Allocation,ServiceInstance,Endpoint,Inventory
+from .fleet import FleetResult
+from .metrics import ClientMetrics
+from .tracing import Tracer,Span,JsonlExporter
+
+
+def __getattr__(name):
+    # the async client pulls in aiohttp, so only import it when asked for
+    if name in ("AsyncClient", "AsyncSession"):
+        from . import aio
+        return getattr(aio, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,338 @@
+import ssl
+import time
+import json
+import base64
+import asyncio
+import logging
+from .client import Client, Session, SessionError, SessStatusResponse, State, _SLEEP
+from .wait import ExecWaiter, StateWaiter
+from .model import Allocation, Inventory
+from .fleet import FleetResult, exec_targets, exec_request, failed_result
+from .logs import server_time
+from .tracing import traced
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+log = logging.getLogger(__name__)
+
+
+class AsyncResult(object):
+    """Fully read aiohttp response, shaped like the parts of
+    requests.Response the shared Response classes rely on."""
+    def __init__(self, status, content, headers):
+        self.status_code = status
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+class AsyncStream(object):
+    """aiohttp response whose body is left to be read from content as it
+    arrives, shaped like AsyncResult otherwise. close() releases it."""
+    def __init__(self, res):
+        self._res = res
+        self.status_code = res.status
+        self.content = res.content
+        self.headers = res.headers
+
+    async def text(self):
+        return await self._res.text()
+
+    def close(self):
+        self._res.release()
+
+
+class AsyncClient(Client):
+    """asyncio mirror of Client.
+
+    Every API method of Client is available here and returns an awaitable
+    that resolves to the same Response classes. All requests share one
+    aiohttp connection pool, so many calls can be in flight at once.
+    """
+    _transient = (aiohttp.ClientConnectionError, asyncio.TimeoutError) if aiohttp else ()
+
+    def __init__(self, url=None, auth=None, verify=False, timeout=None,
+                 pool_connections=1, pool_maxsize=100, keepalive=True,
+                 cache=None, retry=None, breaker=None, metrics=None, tracer=None):
+        if aiohttp is None:
+            raise ImportError("AsyncClient requires aiohttp (pip install aiohttp)")
+        super().__init__(url, auth=auth, verify=verify, timeout=timeout,
+                         pool_connections=pool_connections,
+                         pool_maxsize=pool_maxsize, keepalive=keepalive,
+                         cache=cache, retry=retry, breaker=breaker, metrics=metrics,
+                         tracer=tracer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _transport(self, pool_connections, pool_maxsize, keepalive):
+        # the aiohttp session must be created inside the running loop
+        self._pool_maxsize = pool_maxsize
+        self._keepalive = keepalive
+        return None
+
+    def _ssl(self):
+        if self.verify is True:
+            return None
+        if not self.verify:
+            return False
+        return ssl.create_default_context(cafile=self.verify)
+
+    def _session(self):
+        if self._http is None or self._http.closed:
+            conn = aiohttp.TCPConnector(limit=self._pool_maxsize,
+                                        force_close=not self._keepalive,
+                                        ssl=self._ssl())
+            self._http = aiohttp.ClientSession(connector=conn)
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def getSession(self, clone=None, chunk_size=None):
+        return AsyncSession.create(self, clone, chunk_size)
+
+    async def _request(self, cls, op, url, hdrs=None, data=None):
+        return cls(await self._call(op, url, hdrs, data))
+
+    async def _call(self, op, url, hdrs=None, data=None, auth=None, stream=False):
+        steps = self._steps(op, url, hdrs, data, auth, stream)
+        try:
+            step, arg = next(steps)
+            while True:
+                if step is _SLEEP:
+                    await asyncio.sleep(arg)
+                    step, arg = next(steps)
+                    continue
+                try:
+                    res = await self._send(op, url, arg, data, auth, stream)
+                except Exception as e:
+                    step, arg = steps.throw(e)
+                else:
+                    step, arg = steps.send(res)
+        except StopIteration as stop:
+            return stop.value
+
+    async def stream_logs(self, Id, nname, follow=False, lines=True, interval=2.0,
+                          chunk_size=65536, **kwargs):
+        params, overlap = self._logs_params(follow and lines, kwargs)
+        while True:
+            res = await self._call("GET", self._logs_url(Id, nname, params), stream=True)
+            try:
+                if res.status_code >= 400:
+                    raise Exception("Error fetching logs: {} {}".format(res.status_code, await res.text()))
+                polled = server_time(res.headers, time.time())
+                if lines:
+                    overlap.start()
+                    async for raw in res.content:
+                        line = overlap.feed(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+                        if line is not None:
+                            yield line
+                else:
+                    async for chunk in res.content.iter_chunked(chunk_size):
+                        yield chunk
+            finally:
+                res.close()
+            if not follow:
+                return
+            params.pop("tail", None)
+            params["since"] = overlap.since(polled)
+            await asyncio.sleep(interval)
+
+    async def exec_run(self, exec_request, timeout=None, callback=None, **kwargs):
+        req = self._exec_start(exec_request)
+        exec_id = self._exec_id(await self.exec_create(req))
+        return await self.exec_wait(req["node"], exec_id, timeout, callback, **kwargs)
+
+    async def exec_wait(self, node, exec_id, timeout=None, callback=None, **kwargs):
+        return (await self.exec_wait_all([(node, exec_id)], timeout, callback, **kwargs))[0]
+
+    async def exec_wait_all(self, targets, timeout=None, callback=None, interval=0.05,
+                            max_interval=2.0, budget=None):
+        waiter = ExecWaiter(targets, timeout, callback, interval, max_interval, budget)
+        while not waiter.done:
+            due = waiter.due()
+            rets = await asyncio.gather(*[self.exec_status(*t) for t in due],
+                                        return_exceptions=True)
+            for t,ret in zip(due, rets):
+                waiter.update(t, ret)
+            await asyncio.sleep(waiter.wait_time())
+        return list(waiter.results.values())
+
+    async def exec_fleet(self, cmd, session=None, nodes=None, inventory=None, workers=8,
+                         timeout=None, callback=None, **kwargs):
+        if isinstance(session, Session):
+            targets = exec_targets(session.inventory(), nodes=nodes)
+        else:
+            if inventory is None:
+                ret = await (self.active(Id=session) if session is not None else self.active())
+                if ret.error():
+                    raise Exception("Error listing sessions: {}".format(ret))
+                inventory = Inventory(ret.json())
+            targets = exec_targets(inventory, session, nodes)
+        sem = asyncio.Semaphore(max(1, workers))
+
+        async def run(target):
+            aid, inst = target
+            async with sem:
+                try:
+                    return await self.exec_run(exec_request(cmd, inst), timeout,
+                                               callback, **kwargs)
+                except Exception as e:
+                    return failed_result(inst, e)
+
+        rets = await asyncio.gather(*[run(t) for t in targets])
+        return FleetResult(cmd, [ (aid, inst, res) for (aid,inst),res in zip(targets, rets) ])
+
+    async def _probe(self, alloc, timeout):
+        async def connect(ep):
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ep.host, int(ep.port)), timeout)
+                writer.close()
+                return True
+            except (OSError, ValueError, asyncio.TimeoutError):
+                return False
+        eps = [ i.endpoint for i in Allocation(alloc).instances if i.endpoint ]
+        return all(await asyncio.gather(*[connect(ep) for ep in eps]))
+
+    async def wait_all(self, sessions, state=State.STARTED.name, timeout=None,
+                       probe=False, probe_timeout=1.0, interval=0.1, max_interval=5.0):
+        waiter = StateWaiter(self._wait_ids(sessions), state, timeout, interval, max_interval)
+        while True:
+            ret = await self.active()
+            if not ret.error():
+                reached = waiter.update(ret.json())
+                if probe:
+                    oks = await asyncio.gather(*[self._probe(a, probe_timeout) for a in reached])
+                    reached = [ a for a,ok in zip(reached, oks) if ok ]
+                for alloc in reached:
+                    waiter.ready(alloc['id'])
+            if waiter.done or waiter.expired:
+                break
+            await asyncio.sleep(waiter.wait_time())
+        return self._wait_done(sessions, waiter)
+
+    def _headers(self, hdrs, auth):
+        hdrs = dict(hdrs or {})
+        if auth:
+            cred = base64.b64encode("{}:{}".format(*auth).encode()).decode()
+            hdrs["Authorization"] = f"Basic {cred}"
+        return hdrs
+
+    async def _send(self, op, url, hdrs=None, data=None, auth=None, stream=False):
+        if not auth:
+            auth = self.auth
+        kwargs = {"headers": self._headers(hdrs, auth)}
+        if op in ("POST", "PUT"):
+            kwargs["data"] = data
+        if stream:
+            if self.timeout:
+                kwargs["timeout"] = aiohttp.ClientTimeout(sock_read=self.timeout)
+            return AsyncStream(await self._session().request(op, url, **kwargs))
+        if op == "GET" and self.timeout:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=self.timeout)
+        async with self._session().request(op, url, **kwargs) as res:
+            content = await res.read()
+            return AsyncResult(res.status, content, res.headers)
+
+
+class AsyncSession(Session):
+    """Session driven by an AsyncClient.
+
+    Per-allocation start/stop/destroy/status requests are issued
+    concurrently and reported like Session, through SessOpResponse and
+    SessionError. Obtain one with ``await client.getSession()``.
+    """
+    def __init__(self, client, json=None, chunk_size=None):
+        super().__init__(client, json=json, chunk_size=chunk_size)
+
+    @classmethod
+    async def create(cls, client, clone=None, chunk_size=None):
+        sess = cls(client, chunk_size=chunk_size)
+        if clone:
+            ret = (await client.active(Id=clone)).json()
+            for s in ret:
+                for k,v in s.items():
+                    sess._manifest.update(s)
+                    sess._requests.extend(v['request'])
+        return sess
+
+    @traced("session.initialize")
+    async def initialize(self):
+        chunks = self._chunks()
+        if chunks:
+            return await self._initialize_chunks(chunks)
+        ret = await self._client.create(self._requests)
+        if not ret.error():
+            self._manifest.update(ret.json())
+        else:
+            raise Exception("Error initializing service: {}".format(ret))
+        return ret
+
+    async def _fan_out(self, fn, keys=None):
+        keys = list(self._manifest if keys is None else keys)
+        rets = await asyncio.gather(*[fn(k) for k in keys], return_exceptions=True)
+        return self._collect(keys, rets)
+
+    async def _initialize_chunks(self, chunks):
+        ret = await self._fan_out(lambda i: self._client.create(chunks[i]), range(len(chunks)))
+        if ret.error():
+            undo = await self._fan_out(self._client.delete, self._created(ret))
+            raise SessionError("initializing", ret, undo)
+        self._manifest.update(ret.json())
+        return ret
+
+    @traced("session.destroy")
+    async def destroy(self):
+        ret = await self._fan_out(self._client.delete)
+        self._state = State.DESTROYED.name
+        if ret.error():
+            raise SessionError("destroying", ret)
+        return ret
+
+    @traced("session.start")
+    async def start(self):
+        if self._state is not State.INITIALIZED.name:
+            await self.initialize()
+        ret = await self._fan_out(self._client.start)
+        self._update_state(ret)
+        if ret.error():
+            raise SessionError("starting", ret)
+        return ret
+
+    async def status(self):
+        ret = await self._fan_out(lambda k: self._client.active(Id=k))
+        if ret.error():
+            raise SessionError("querying", ret)
+        return SessStatusResponse([ r.json() for r in ret.results.values() ])
+
+    @traced("session.stop")
+    async def stop(self):
+        ret = await self._fan_out(self._client.stop)
+        self._update_state(ret)
+        if ret.error():
+            raise SessionError("stopping", ret)
+        return ret
+
+    @traced("session.wait_until")
+    async def wait_until(self, state=State.STARTED.name, timeout=None, probe=False, **kwargs):
+        allocs = await self._client.wait_all([self], state, timeout, probe, **kwargs)
+        return SessStatusResponse([ allocs[str(k)] for k in self._manifest ])
@@ -0,0 +1,105 @@
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# seconds a cached listing is served without asking the controller;
+# endpoints not listed here are never cached
+DEFAULT_TTL = {"nodes": 30,
+               "profiles": 300,
+               "images": 300}
+
+
+class CacheEntry(object):
+    __slots__ = ("response", "expires", "etag", "modified")
+
+    def __init__(self, response, ttl):
+        self.response = response
+        self.etag = response.headers.get("ETag")
+        self.modified = response.headers.get("Last-Modified")
+        self.touch(ttl)
+
+    def touch(self, ttl):
+        self.expires = time.monotonic() + ttl
+
+    def fresh(self):
+        return time.monotonic() < self.expires
+
+
+class ResponseCache(object):
+    '''Client-side cache for read-mostly GET endpoints.
+
+    Entries live for a per-endpoint TTL and are evicted LRU beyond
+    maxsize. Once an entry expires it is revalidated with If-None-Match /
+    If-Modified-Since, and a 304 from the controller renews it. Any write
+    (POST/PUT/DELETE) to an endpoint drops that endpoint's entries, and
+    "refresh=true" requests skip the lookup but still store the result.
+    '''
+    def __init__(self, ttl=None, maxsize=256):
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(url):
+        '''Strip refresh=true from the url, returning (key, refresh).'''
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query)
+        kept = [ (k,v) for k,v in query if k != "refresh" ]
+        refresh = len(kept) != len(query)
+        return urlunsplit(parts._replace(query=urlencode(kept))), refresh
+
+    def lookup(self, ep, url, hdrs=None):
+        '''Returns (entry, hdrs) for a GET of url on endpoint ep. The entry
+        is None on a miss or bypass; hdrs carries any conditional headers
+        to send.'''
+        if ep not in self.ttl:
+            return None, hdrs
+        key, refresh = self._key(url)
+        if refresh:
+            return None, hdrs
+        with self._lock:
+            entry = self._entries.get((ep, key))
+            if entry:
+                self._entries.move_to_end((ep, key))
+        if not entry or entry.fresh():
+            return entry, hdrs
+        hdrs = dict(hdrs or {})
+        if entry.etag:
+            hdrs["If-None-Match"] = entry.etag
+        if entry.modified:
+            hdrs["If-Modified-Since"] = entry.modified
+        return entry, hdrs
+
+    def store(self, ep, url, res, entry=None):
+        '''Record the controller's answer and return the response to hand
+        back to the caller.'''
+        if ep not in self.ttl:
+            return res
+        if res.status_code == 304 and entry:
+            entry.touch(self.ttl[ep])
+            return entry.response
+        if res.status_code != 200:
+            return res
+        key, _ = self._key(url)
+        with self._lock:
+            self._entries[(ep, key)] = CacheEntry(res, self.ttl[ep])
+            self._entries.move_to_end((ep, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return res
+
+    def invalidate(self, ep=None):
+        '''Drop the entries of endpoint ep, or everything.'''
+        with self._lock:
+            if not ep:
+                self._entries.clear()
+                return
+            for k in [ k for k in self._entries if k[0] == ep ]:
+                del self._entries[k]
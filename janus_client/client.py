@@ -1,8 +1,26 @@
 import json
+import time
 import uuid
+import socket
 import logging
 import requests
 from enum import Enum
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from .cache import ResponseCache
+from .retry import RetryPolicy, CircuitBreaker
+from .metrics import ClientMetrics, endpoint_template
+from .tracing import propagate, traced
+from .wait import ExecWaiter, StateWaiter
+from .model import Allocation, Inventory
+from .fleet import FleetResult, exec_targets, exec_request, failed_result
+from .logs import LogOverlap, server_time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class State(Enum):
@@ -16,6 +34,25 @@ class State(Enum):
 log = logging.getLogger(__name__)
 API_PREFIX="/api/janus/controller"
 
+_loads = orjson.loads if orjson else json.loads
+
+def set_decoder(loads=None):
+    '''Decode response bodies with loads(bytes). None restores the
+    default: orjson when installed, json otherwise.'''
+    global _loads
+    if loads is None:
+        loads = orjson.loads if orjson else json.loads
+    _loads = loads
+
+def _decode(content):
+    try:
+        return _loads(content)
+    except ValueError:
+        # the stdlib is more lenient (NaN, Infinity, big ints)
+        if _loads is json.loads:
+            raise
+        return json.loads(content)
+
 class SessionResponse(object):
     def __init__(self, data):
         self._data = data
@@ -27,6 +64,17 @@ class SessEndpointResponse(SessionResponse):
     def __str__(self):
         return '\n'.join([ "{}: {}".format(k,v) for k,v in self._data.items() ])
 
+    @classmethod
+    def from_allocations(cls, allocs):
+        eps = dict()
+        for a in allocs:
+            for i in a.instances:
+                if i.errors:
+                    eps.update({"{} (Errors)".format(i.node): "{}".format(i.errors)})
+                else:
+                    eps.update({i.node: "{}".format(i.endpoint)})
+        return cls(eps)
+
 class SessStatusResponse(SessionResponse):
     def __str__(self):
         ret = ""
@@ -37,6 +85,47 @@ class SessStatusResponse(SessionResponse):
                     ret += "id: {}, service: {}, errors: {}\n".format(k, l, s['errors'])
         return ret
 
+class SessOpResponse(SessionResponse):
+    '''Per-allocation outcome of a Session operation. Successful
+    Responses are kept in results, failures (error Responses or raised
+    exceptions) in errors, both keyed by allocation id.
+    '''
+    def __init__(self, results, errors):
+        super().__init__(results)
+        self.results = results
+        self.errors = errors
+
+    def __str__(self):
+        ret = [ "{}: OK".format(k) for k in self.results ]
+        ret += [ "{}: {}".format(k,e) for k,e in self.errors.items() ]
+        return '\n'.join(ret)
+
+    def json(self):
+        ret = dict()
+        for r in self.results.values():
+            ret.update(r.json() or {})
+        return ret
+
+    def error(self):
+        return bool(self.errors)
+
+class SessionError(Exception):
+    def __init__(self, action, response, rollback=None):
+        self.response = response
+        # the deletes undoing a failed initialize, if any were needed
+        self.rollback = rollback
+        msg = "Error {} service: {}".format(
+            action, ', '.join([ "{}: {}".format(k,e) for k,e in response.errors.items() ]))
+        if self.orphaned:
+            msg += "; could not roll back {}".format(', '.join(self.orphaned))
+        super().__init__(msg)
+
+    @property
+    def orphaned(self):
+        '''Allocation ids the rollback failed to delete, which are
+        still held on the controller.'''
+        return [ str(k) for k in self.rollback.errors ] if self.rollback else []
+
 class Service(object):
     def __init__(self, instances=None, image=None, profile=None,
                  username=None, public_key=None, manifest=None, **kwargs):
@@ -63,27 +152,49 @@ class Service(object):
     def endpoints(self):
         if not self._manifest:
             return None
-        eps = dict()
-        for k,v in self._manifest['services'].items():
-            for s in v:
-                if s['errors']:
-                    eps.update({"{} (Errors)".format(k): "{}".format(s['errors'])})
-                else:
-                    eps.update({k: "{}:{}".format(s['ctrl_host'], s['ctrl_port'])})
-        return SessEndpointResponse(eps)
+        return SessEndpointResponse.from_allocations([Allocation(self._manifest)])
+
+_UNSET = object()
+# what Client._steps asks its transport to do next
+_SEND = "send"
+_SLEEP = "sleep"
+# workers for a chunked initialize when getSession() is not given any
+CHUNK_WORKERS = 8
+
+def split_requests(reqs, chunk_size):
+    '''Split service requests into lists of at most chunk_size instances,
+    dividing a request's instances between lists where needed.'''
+    chunks = [[]]
+    count = 0
+    for req in reqs:
+        insts = list(req.get("instances") or [])
+        if not insts:
+            chunks[-1].append(req)
+        while insts:
+            if count == chunk_size:
+                chunks.append([])
+                count = 0
+            part = insts[:chunk_size - count]
+            insts = insts[len(part):]
+            chunks[-1].append(dict(req, instances=part))
+            count += len(part)
+    return [ c for c in chunks if c ]
 
 class Response(object):
     def __init__(self, res):
         self._data = res
+        self._json = _UNSET
 
     def __str__(self):
         return "{} {}".format(self._data.status_code,
-                              self._data.json())
+                              self.json())
 
     def json(self):
-        if not self._data.content:
-            return None
-        return self._data.json()
+        # decoded once, callers share the result
+        if self._json is _UNSET:
+            content = self._data.content
+            self._json = _decode(content) if content else None
+        return self._json
 
     def error(self):
         if self._data.status_code > 400:
@@ -122,8 +233,16 @@ class ActiveResponse(Response):
             ret.append({item['id']: Service(manifest=item)})
         return ret
 
+    def inventory(self):
+        return Inventory(self.json())
+
 class Client(object):
-    def __init__(self, url=None, auth=None, verify=False, timeout=None):
+    # transport errors worth retrying and counting against the breaker
+    _transient = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, url=None, auth=None, verify=False, timeout=None,
+                 pool_connections=1, pool_maxsize=10, keepalive=True,
+                 cache=None, retry=None, breaker=None, metrics=None, tracer=None):
         self.url = "{}{}".format(url, API_PREFIX)
         self.auth = auth
         self.verify = verify
@@ -132,12 +251,49 @@ class Client(object):
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
         self.timeout = timeout
+        self.cache = ResponseCache() if cache is True else cache
+        self.retry = RetryPolicy() if retry is True else retry
+        self.breaker = CircuitBreaker() if breaker is True else breaker
+        self.metrics = ClientMetrics() if metrics is True else metrics
+        self.tracer = tracer
+        self._http = self._transport(pool_connections, pool_maxsize, keepalive)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _transport(self, pool_connections, pool_maxsize, keepalive):
+        # One pooled requests.Session per client: connections (and their
+        # TLS state) are kept alive and reused across calls instead of
+        # doing a full TCP+TLS handshake for every request.
+        http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+        if not keepalive:
+            http.headers["Connection"] = "close"
+        return http
+
+    def close(self):
+        self._http.close()
 
     def setURL(self, url):
         self.url = url
 
-    def getSession(self, clone=None):
-        return Session(self, clone)
+    def getSession(self, clone=None, workers=None, chunk_size=None):
+        '''A new Session, or one for the active session clone.
+
+        Per-allocation requests (start, stop, destroy, ...) run on up to
+        workers threads, one at a time by default. With chunk_size the
+        initialize creates one allocation per chunk of at most that many
+        instances; those run on CHUNK_WORKERS threads unless workers is
+        given.'''
+        if workers is None:
+            workers = CHUNK_WORKERS if chunk_size else 1
+        return Session(self, clone, workers=workers, chunk_size=chunk_size)
 
     def config(self):
         print("URL: {}".format(self.url))
@@ -150,21 +306,68 @@ class Client(object):
             url = "{}/{}".format(url, user)
         elif name:
             url = "{}/{}".format(url, name)
-        return ActiveResponse(self._call("GET", url))
+        return self._request(ActiveResponse, "GET", url)
 
-    def active_logs(self, Id, nname, **kwargs):
-        params = "&".join([f"{k}={v}" for k, v in kwargs.items()])
+    def _logs_url(self, Id, nname, params):
         url = f"{self.url}/active/{Id}/logs/{nname}"
         if params:
-            url = f"{url}?{params}"
-        return Response(self._call("GET", url))
+            url = f"{url}?{urlencode(params)}"
+        return url
+
+    def active_logs(self, Id, nname, **kwargs):
+        url = self._logs_url(Id, nname, kwargs)
+        return self._request(Response, "GET", url)
+
+    def stream_logs(self, Id, nname, follow=False, lines=True, interval=2.0,
+                    chunk_size=65536, **kwargs):
+        '''Generator over the container logs of node nname in session Id.
+
+        The body is read incrementally (stream=True) and yielded as text
+        lines, or as raw byte chunks with lines=False. kwargs such as tail,
+        since, stdout, stderr and timestamps are passed to the controller.
+        With follow=True the controller is polled every interval seconds
+        for output newer than the previous poll; close the generator to
+        stop. Followed lines are polled by their timestamps and lines a
+        poll repeats are dropped; raw chunks are polled by the controller's
+        clock (its Date header) and may repeat.
+        '''
+        params, overlap = self._logs_params(follow and lines, kwargs)
+        while True:
+            with self._call("GET", self._logs_url(Id, nname, params), stream=True) as res:
+                if res.status_code >= 400:
+                    raise Exception("Error fetching logs: {} {}".format(res.status_code, res.text))
+                polled = server_time(res.headers, time.time())
+                if lines:
+                    res.encoding = res.encoding or "utf-8"
+                    overlap.start()
+                    for line in res.iter_lines(decode_unicode=True):
+                        line = overlap.feed(line)
+                        if line is not None:
+                            yield line
+                else:
+                    yield from res.iter_content(chunk_size)
+            if not follow:
+                return
+            params.pop("tail", None)
+            params["since"] = overlap.since(polled)
+            time.sleep(interval)
+
+    @staticmethod
+    def _logs_params(dedupe, kwargs):
+        '''The stream_logs query and its LogOverlap. Deduping needs the
+        controller's timestamps, which are stripped again unless asked for.'''
+        params = dict(kwargs)
+        if dedupe and not params.get("timestamps"):
+            params["timestamps"] = "true"
+            return params, LogOverlap(strip=True)
+        return params, LogOverlap()
 
     def delete(self, Id, force=False):
         ep = f'/active/{Id}'
         if force:
             ep = f"{ep}?force=true"
         url = f"{self.url}{ep}"
-        return Response(self._call("DELETE", url))
+        return self._request(Response, "DELETE", url)
 
     def nodes(self, node=None, node_id=None, refresh=False):
         if node and node_id:
@@ -177,13 +380,13 @@ class Client(object):
         elif refresh:
             ep = f"{ep}?refresh=true"
         url = f"{self.url}{ep}"
-        return NodeResponse(self._call("GET", url))
+        return self._request(NodeResponse, "GET", url)
 
     def add_node(self, node_data):
         hdr = {"Content-type": "application/json"}
         payload = json.dumps(node_data)
         url = f"{self.url}/nodes"
-        return Response(self._call("POST", url, hdr, payload))
+        return self._request(Response, "POST", url, hdr, payload)
 
     def delete_node(self, node=None, node_id=None):
         if node:
@@ -192,7 +395,7 @@ class Client(object):
             url = f"{self.url}/nodes/{node_id}"
         else:
             raise ValueError("Must specify either node name or node_id")
-        return Response(self._call("DELETE", url))
+        return self._request(Response, "DELETE", url)
 
     def create(self, req, name=None):
         hdr = {"Content-type": "application/json"}
@@ -202,31 +405,154 @@ class Client(object):
         if name:
             url = f"{url}/{name}"
 
-        return Response(self._call("POST", url, hdr, payload))
+        return self._request(Response, "POST", url, hdr, payload)
 
     def start(self, id):
         url = f"{self.url}/start/{id}"
-        return Response(self._call("PUT", url))
+        return self._request(Response, "PUT", url)
 
     def stop(self, id):
         url = f"{self.url}/stop/{id}"
-        return Response(self._call("PUT", url))
+        return self._request(Response, "PUT", url)
 
     def exec_create(self, exec_request):
         hdr = {"Content-type": "application/json"}
         payload = json.dumps(exec_request)
         url = f"{self.url}/exec"
-        return Response(self._call("POST", url, hdr, payload))
+        return self._request(Response, "POST", url, hdr, payload)
 
     def exec_status(self, node, exec_id):
         url = f"{self.url}/exec?node={node}&exec_id={exec_id}"
-        return Response(self._call("GET", url))
+        return self._request(Response, "GET", url)
+
+    @staticmethod
+    def _exec_start(exec_request):
+        req = dict(exec_request)
+        req.setdefault("start", True)
+        return req
+
+    @staticmethod
+    def _exec_id(ret):
+        if ret.error():
+            raise Exception("Error creating exec: {}".format(ret))
+        return ret.json().get("Id") or ret.json().get("id")
+
+    def exec_run(self, exec_request, timeout=None, callback=None, **kwargs):
+        '''exec_create (started unless the request says otherwise), then
+        exec_wait on it. Returns an ExecResult.'''
+        req = self._exec_start(exec_request)
+        exec_id = self._exec_id(self.exec_create(req))
+        return self.exec_wait(req["node"], exec_id, timeout, callback, **kwargs)
+
+    def exec_wait(self, node, exec_id, timeout=None, callback=None, **kwargs):
+        '''Poll exec_status with adaptive backoff until the exec finishes
+        or timeout expires. callback(node, exec_id, text) receives new
+        output as it appears. Returns an ExecResult.'''
+        return self.exec_wait_all([(node, exec_id)], timeout, callback, **kwargs)[0]
+
+    def exec_wait_all(self, targets, timeout=None, callback=None, interval=0.05,
+                      max_interval=2.0, budget=None):
+        '''exec_wait on many (node, exec_id) pairs at once, with a shared
+        deadline and at most budget status requests per second.'''
+        waiter = ExecWaiter(targets, timeout, callback, interval, max_interval, budget)
+        while not waiter.done:
+            for node,exec_id in waiter.due():
+                try:
+                    ret = self.exec_status(node, exec_id)
+                except Exception as e:
+                    ret = e
+                waiter.update((node, exec_id), ret)
+            time.sleep(waiter.wait_time())
+        return list(waiter.results.values())
+
+    def _fleet_targets(self, session, nodes, inventory):
+        if isinstance(session, Session):
+            return exec_targets(session.inventory(), nodes=nodes)
+        if inventory is None:
+            ret = self.active(Id=session) if session is not None else self.active()
+            if ret.error():
+                raise Exception("Error listing sessions: {}".format(ret))
+            inventory = Inventory(ret.json())
+        return exec_targets(inventory, session, nodes)
+
+    def exec_fleet(self, cmd, session=None, nodes=None, inventory=None, workers=8,
+                   timeout=None, callback=None, **kwargs):
+        '''Run cmd in every container of session (a Session or allocation
+        id), or of all active sessions, optionally only those on nodes.
+        At most workers execs run at once, each with its own timeout;
+        callback(node, exec_id, text) streams output as it arrives. An
+        Inventory avoids fetching the active listing. Returns a
+        FleetResult.'''
+        targets = self._fleet_targets(session, nodes, inventory)
+
+        def run(target):
+            aid, inst = target
+            try:
+                return self.exec_run(exec_request(cmd, inst), timeout, callback, **kwargs)
+            except Exception as e:
+                return failed_result(inst, e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets) or 1))) as pool:
+            rets = list(pool.map(propagate(run), targets))
+        return FleetResult(cmd, [ (aid, inst, res) for (aid,inst),res in zip(targets, rets) ])
+
+    def _wait_ids(self, sessions):
+        ids = list()
+        for s in sessions:
+            ids.extend(s._manifest if isinstance(s, Session) else [s])
+        return ids
+
+    def _wait_done(self, sessions, waiter):
+        '''Update the sessions from the last listing and raise if the wait
+        did not succeed.'''
+        for s in sessions:
+            if isinstance(s, Session):
+                s._update_allocations(waiter.allocations)
+        if waiter.missing:
+            errors = { k: "allocation not found" for k in sorted(waiter.missing) }
+            raise SessionError("waiting for", SessOpResponse(dict(), errors))
+        if waiter.pending:
+            raise TimeoutError("Timed out waiting for {}: {}".format(
+                waiter.state, ', '.join(sorted(waiter.pending))))
+        return waiter.allocations
+
+    def _probe(self, alloc, timeout):
+        '''True if every service endpoint of alloc accepts a TCP connection.'''
+        for inst in Allocation(alloc).instances:
+            if not inst.endpoint:
+                continue
+            try:
+                socket.create_connection((inst.endpoint.host, int(inst.endpoint.port)),
+                                         timeout=timeout).close()
+            except (OSError, ValueError):
+                return False
+        return True
+
+    def wait_all(self, sessions, state=State.STARTED.name, timeout=None,
+                 probe=False, probe_timeout=1.0, interval=0.1, max_interval=5.0):
+        '''Wait until every allocation of sessions (Session objects or
+        allocation ids) reports state, fetching the active listing once
+        per poll. With probe=True an allocation also has to accept TCP
+        connections on each service's ctrl_host:ctrl_port. Returns the
+        allocations by id; raises TimeoutError once timeout expires and
+        SessionError if an allocation goes away.'''
+        waiter = StateWaiter(self._wait_ids(sessions), state, timeout, interval, max_interval)
+        while True:
+            ret = self.active()
+            if not ret.error():
+                for alloc in waiter.update(ret.json()):
+                    if not probe or self._probe(alloc, probe_timeout):
+                        waiter.ready(alloc['id'])
+            if waiter.done or waiter.expired:
+                break
+            time.sleep(waiter.wait_time())
+        return self._wait_done(sessions, waiter)
 
     def images(self, name=None):
         url = f"{self.url}/images"
         if name:
             url = f"{url}/{name}"
-        return Response(self._call("GET", url))
+        return self._request(Response, "GET", url)
 
     def profiles(self, resource=None, name=None, refresh=False):
         if resource and name:
@@ -237,23 +563,23 @@ class Client(object):
             url = f"{self.url}/profiles"
         if refresh:
             url += "?refresh=true"
-        return ProfileResponse(self._call("GET", url))
+        return self._request(ProfileResponse, "GET", url)
 
     def create_profile(self, resource, name, settings):
         hdr = {"Content-type": "application/json"}
         payload = json.dumps({"settings": settings})
         url = f"{self.url}/profiles/{resource}/{name}"
-        return Response(self._call("POST", url, hdr, payload))
+        return self._request(Response, "POST", url, hdr, payload)
 
     def update_profile(self, resource, name, settings):
         hdr = {"Content-type": "application/json"}
         payload = json.dumps({"settings": settings})
         url = f"{self.url}/profiles/{resource}/{name}"
-        return Response(self._call("PUT", url, hdr, payload))
+        return self._request(Response, "PUT", url, hdr, payload)
 
     def delete_profile(self, resource, name):
         url = f"{self.url}/profiles/{resource}/{name}"
-        return Response(self._call("DELETE", url))
+        return self._request(Response, "DELETE", url)
 
     def update_users(self, resource_type, resource, users=None, groups=None):
         hdr = {"Content-type": "application/json"}
@@ -261,34 +587,155 @@ class Client(object):
         users = users or []
         groups = groups or []
         payload = json.dumps({"users": users, "groups": groups})
-        return Response(self._call("POST", url, hdr, payload))
-
-    def _call(self, op, url, hdrs=None, data=None, auth=None):
+        return self._request(Response, "POST", url, hdr, payload)
+
+    def _request(self, cls, op, url, hdrs=None, data=None):
+        return cls(self._call(op, url, hdrs, data))
+
+    def _endpoint(self, url):
+        return url[len(self.url):].split("?")[0].strip("/").split("/")[0]
+
+    def _call(self, op, url, hdrs=None, data=None, auth=None, stream=False):
+        steps = self._steps(op, url, hdrs, data, auth, stream)
+        try:
+            step, arg = next(steps)
+            while True:
+                if step is _SLEEP:
+                    time.sleep(arg)
+                    step, arg = next(steps)
+                    continue
+                try:
+                    res = self._send(op, url, arg, data, auth, stream)
+                except Exception as e:
+                    step, arg = steps.throw(e)
+                else:
+                    step, arg = steps.send(res)
+        except StopIteration as stop:
+            return stop.value
+
+    def _steps(self, op, url, hdrs=None, data=None, auth=None, stream=False):
+        '''Everything about one controller call but the I/O, for _call
+        of either transport to drive. Yields (_SEND, hdrs) for each
+        request to make and is sent its response or thrown its error,
+        yields (_SLEEP, delay) between retries, and returns the result.
+        A stream's body is left unread for the caller, so it is never
+        cached.'''
+        fetch = self._fetch if stream else self._cached
+        if self.metrics is None and self.tracer is None:
+            return (yield from fetch(op, url, hdrs, data, auth))
+        span, hdrs = self._trace_start(op, url, hdrs)
+        start = time.perf_counter()
+        try:
+            res = yield from fetch(op, url, hdrs, data, auth)
+        except Exception as e:
+            self._observe(op, url, e, start, data, span)
+            raise
+        self._observe(op, url, res, start, data, span, stream)
+        return res
+
+    def _trace_start(self, op, url, hdrs):
+        if self.tracer is None:
+            return None, hdrs
+        path = url[len(self.url):]
+        span = self.tracer.start(f"{op} {endpoint_template(path)}", method=op, path=path)
+        return span, self.tracer.request(span, op, url, hdrs)
+
+    def _observe(self, op, url, res, start, data, span, stream=False):
+        if self.metrics is not None:
+            # reading a stream's content here would consume it
+            received = int(res.headers.get("Content-Length", 0)) if stream else None
+            self.metrics.observe(op, url[len(self.url):], res, time.perf_counter() - start,
+                                 data, received)
+        if span is None:
+            return
+        if isinstance(res, Exception):
+            self.tracer.response(span, res, res)
+            return
+        span.attrs["status"] = res.status_code
+        self.tracer.response(span, res)
+
+    def _cached(self, op, url, hdrs=None, data=None, auth=None):
+        if self.cache is None:
+            return (yield from self._fetch(op, url, hdrs, data, auth))
+        ep = self._endpoint(url)
+        if op != "GET":
+            res = yield from self._fetch(op, url, hdrs, data, auth)
+            self.cache.invalidate(ep)
+            return res
+        entry, hdrs = self.cache.lookup(ep, url, hdrs)
+        if entry and entry.fresh():
+            return entry.response
+        res = yield from self._fetch(op, url, hdrs, data, auth)
+        return self.cache.store(ep, url, res, entry)
+
+    def _record(self, ok):
+        if self.breaker:
+            self.breaker.record(ok)
+
+    def _next_delay(self, delays, res=None):
+        '''Next backoff delay, or None when the call should not be retried.'''
+        if not self.retry or (res is not None and not self.retry.retry_status(res)):
+            return None
+        delay = next(delays, None)
+        if delay is not None and res is not None:
+            delay = self.retry.delay_for(res, delay)
+        return delay
+
+    def _fetch(self, op, url, hdrs=None, data=None, auth=None):
+        delays = self.retry.delays(op) if self.retry else None
+        while True:
+            if self.breaker:
+                self.breaker.check()
+            try:
+                res = yield _SEND, hdrs
+            except self._transient:
+                self._record(False)
+                delay = self._next_delay(delays)
+                if delay is None:
+                    raise
+            except Exception:
+                # e.g. the body cut off mid-read; still a failed attempt,
+                # and it must end a half-open trial
+                self._record(False)
+                raise
+            else:
+                self._record(res.status_code < 500)
+                delay = self._next_delay(delays, res)
+                if delay is None:
+                    return res
+                res.close()
+            log.debug(f"Retrying {op} {url} in {delay:.2f}s")
+            yield _SLEEP, delay
+
+    def _send(self, op, url, hdrs=None, data=None, auth=None, stream=False):
         if not auth:
             auth = self.auth
         kwargs = {"auth": auth, "verify": self.verify, "headers": hdrs, "data": data}
         if op == "POST":
-            return requests.post(url, **kwargs)
+            return self._http.post(url, **kwargs)
         elif op == "GET":
             kwargs.pop("data", None)
-            return requests.get(url, timeout=self.timeout, **kwargs)
+            return self._http.get(url, timeout=self.timeout, stream=stream, **kwargs)
         elif op == "DELETE":
             kwargs.pop("data", None)
-            return requests.delete(url, **kwargs)
+            return self._http.delete(url, **kwargs)
         elif op == "PUT":
             # kwargs.pop("data", None)
-            return requests.put(url, **kwargs)
+            return self._http.put(url, **kwargs)
 
 class Session(object):
     TMPL="id: {}\nallocated: {}\nrequests: {}\nmanifest: {}\nstate: {}"
 
-    def __init__(self, client, clone=None, json=None):
+    def __init__(self, client, clone=None, json=None, workers=1, chunk_size=None):
         self._id = uuid.uuid4()
         self._client = client
         self._allocated = False
         self._requests = list()
         self._manifest = dict()
         self._state = State.CREATED.name
+        self.workers = workers
+        # initialize() creates allocations of at most this many instances
+        self.chunk_size = chunk_size
 
         if clone:
             ret = self._client.active(Id=clone).json()
@@ -314,7 +761,63 @@ class Session(object):
         else:
             raise Exception("Not a valid Service object: {}".format(srv))
 
+    def _fan_out(self, fn, keys=None):
+        '''Call fn(key) for every allocation in the manifest (or every one
+        of keys), using up to self.workers threads, and collect the
+        outcomes per key.
+        '''
+        def call(k):
+            try:
+                return fn(k)
+            except Exception as e:
+                return e
+
+        keys = list(self._manifest if keys is None else keys)
+        if self.workers > 1 and len(keys) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(keys))) as pool:
+                rets = list(pool.map(propagate(call), keys))
+        else:
+            rets = [ call(k) for k in keys ]
+        return self._collect(keys, rets)
+
+    def _collect(self, keys, rets):
+        results = dict()
+        errors = dict()
+        for k,ret in zip(keys, rets):
+            if isinstance(ret, Exception) or ret.error():
+                errors[k] = ret
+            else:
+                results[k] = ret
+        return SessOpResponse(results, errors)
+
+    def _update_state(self, ret):
+        states = set()
+        for k,r in ret.results.items():
+            self._manifest.update(r.json())
+            states.add(r.json()[k]['state'])
+        if len(states) == 1:
+            self._state = states.pop()
+        elif states:
+            self._state = State.MIXED.name
+
+    def _chunks(self):
+        '''The requests split by chunk_size, or None to create in one go.'''
+        if not self.chunk_size:
+            return None
+        count = sum(len(r.get("instances") or []) for r in self._requests)
+        if count <= self.chunk_size:
+            return None
+        return split_requests(self._requests, self.chunk_size)
+
+    def _created(self, ret):
+        '''Allocation ids made by the successful chunks of a create.'''
+        return [ k for r in ret.results.values() for k in (r.json() or {}) ]
+
+    @traced("session.initialize")
     def initialize(self):
+        chunks = self._chunks()
+        if chunks:
+            return self._initialize_chunks(chunks)
         ret = self._client.create(self._requests)
         if not ret.error():
             self._manifest.update(ret.json())
@@ -322,44 +825,69 @@ class Session(object):
             raise Exception("Error initializing service: {}".format(ret))
         return ret
 
+    def _initialize_chunks(self, chunks):
+        '''Create one allocation per chunk concurrently. If any chunk
+        fails, the allocations the others created are deleted again; the
+        SessionError lists those that could not be as orphaned.'''
+        ret = self._fan_out(lambda i: self._client.create(chunks[i]), range(len(chunks)))
+        if ret.error():
+            undo = self._fan_out(self._client.delete, self._created(ret))
+            raise SessionError("initializing", ret, undo)
+        self._manifest.update(ret.json())
+        return ret
+
+    @traced("session.destroy")
     def destroy(self):
-        for k,v in self._manifest.items():
-            self._client.delete(k)
-            self._state = State.DESTROYED.name
+        ret = self._fan_out(self._client.delete)
+        self._state = State.DESTROYED.name
+        if ret.error():
+            raise SessionError("destroying", ret)
+        return ret
 
+    @traced("session.start")
     def start(self):
         if self._state is not State.INITIALIZED.name:
             self.initialize()
-        ret = dict()
-        for k,v in self._manifest.items():
-            ret = self._client.start(k)
-            if not ret.error():
-                self._manifest.update(ret.json())
-            else:
-                raise Exception("Error starting service: {}".format(ret))
-            self._state = ret.json()[k]['state']
+        ret = self._fan_out(self._client.start)
+        self._update_state(ret)
+        if ret.error():
+            raise SessionError("starting", ret)
         return ret
 
     def status(self):
-        ret = list()
-        for k in self._manifest.keys():
-            ret.append(self._client.active(Id=k).json())
-        return SessStatusResponse(ret)
+        ret = self._fan_out(lambda k: self._client.active(Id=k))
+        if ret.error():
+            raise SessionError("querying", ret)
+        return SessStatusResponse([ r.json() for r in ret.results.values() ])
 
+    @traced("session.stop")
     def stop(self):
-        for k,v in self._manifest.items():
-            ret = self._client.stop(k)
-            if ret.error():
-                raise Exception("Error stopping service: {}".format(ret))
-            self._state = ret.json()[k]['state']
+        ret = self._fan_out(self._client.stop)
+        self._update_state(ret)
+        if ret.error():
+            raise SessionError("stopping", ret)
+        return ret
+
+    def _update_allocations(self, allocs):
+        states = set()
+        for k in self._manifest:
+            if str(k) in allocs:
+                self._manifest[k] = allocs[str(k)]
+            states.add(self._manifest[k].get('state'))
+        if len(states) == 1:
+            self._state = states.pop()
+        elif states:
+            self._state = State.MIXED.name
+
+    @traced("session.wait_until")
+    def wait_until(self, state=State.STARTED.name, timeout=None, probe=False, **kwargs):
+        '''Block until every allocation of the session reports state, see
+        Client.wait_all.'''
+        allocs = self._client.wait_all([self], state, timeout, probe, **kwargs)
+        return SessStatusResponse([ allocs[str(k)] for k in self._manifest ])
+
+    def inventory(self):
+        return Inventory(self._manifest)
 
     def endpoints(self):
-        eps = dict()
-        for k,v in self._manifest.items():
-            for l,w in v['services'].items():
-                for s in w:
-                    if s['errors']:
-                        eps.update({"{} (Errors)".format(l): "{}".format(s['errors'])})
-                    else:
-                        eps.update({l: "{}:{}".format(s['ctrl_host'], s['ctrl_port'])})
-        return SessEndpointResponse(eps)
+        return SessEndpointResponse.from_allocations(self.inventory())
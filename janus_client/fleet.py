@@ -0,0 +1,82 @@
+from .wait import ExecResult
+
+
+def exec_targets(inventory, session=None, nodes=None):
+    '''(allocation id, ServiceInstance) for every container in inventory,
+    or in allocation session only, optionally limited to nodes.'''
+    if session is not None:
+        alloc = inventory.get(session)
+        allocs = [alloc] if alloc else []
+    else:
+        allocs = list(inventory)
+    nodes = set(nodes) if nodes else None
+    return [ (a.id, i) for a in allocs for i in a.instances
+             if nodes is None or i.node in nodes ]
+
+
+def exec_request(cmd, inst):
+    # a string runs through the container's shell, so pipes etc. work
+    if isinstance(cmd, str):
+        cmd = ["sh", "-c", cmd]
+    return {"node": inst.node,
+            "container": inst.container_id,
+            "Cmd": list(cmd),
+            "start": True}
+
+
+def failed_result(inst, error):
+    res = ExecResult(inst.node, None)
+    res.error = str(error)
+    res.running = False
+    res.elapsed = 0.0
+    return res
+
+
+class FleetResult(object):
+    '''One command's outcome in every targeted container.
+
+    items holds (allocation id, ServiceInstance, ExecResult) in target
+    order. The output is what the controller reports for the exec, with
+    stdout and stderr combined.
+    '''
+    def __init__(self, cmd, items):
+        self.cmd = cmd
+        self.items = items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __str__(self):
+        ret = [ f"{aid}/{inst.node} [{inst.container_id}]: {self.state(res)}"
+                for aid,inst,res in self.items ]
+        ret.append(f"{len(self.succeeded)} ok, {len(self.failed)} failed, "
+                   f"{len(self.timed_out)} timed out")
+        return "\n".join(ret)
+
+    @staticmethod
+    def state(res):
+        if res.error:
+            return f"error: {res.error}"
+        if res.running:
+            return f"timed out ({res.elapsed:.2f}s)"
+        return f"exit {res.exit_code} ({res.elapsed:.2f}s)"
+
+    @property
+    def ok(self):
+        return all(res.ok for _,_,res in self.items)
+
+    @property
+    def succeeded(self):
+        return [ i for i in self.items if i[2].ok ]
+
+    @property
+    def failed(self):
+        return [ i for i in self.items if not i[2].ok and not i[2].timed_out ]
+
+    @property
+    def timed_out(self):
+        return [ i for i in self.items if i[2].timed_out ]
+
+    def json(self):
+        return [ dict(res.json(), session=aid, container=inst.container_id)
+                 for aid,inst,res in self.items ]
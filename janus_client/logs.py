@@ -0,0 +1,69 @@
+import re
+import time
+from calendar import timegm
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+# the RFC3339Nano prefix timestamps=true puts on every line
+TIMESTAMP = re.compile(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d{1,9}))?Z ")
+
+
+def server_time(headers, default):
+    '''The controller's clock from a response Date header, or default when
+    there is none. Date has whole seconds and is rounded down, so polling
+    from it can repeat output but never skip any.'''
+    try:
+        return parsedate_to_datetime(headers["Date"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+def log_time(match):
+    '''(seconds, nanoseconds) since the epoch of a TIMESTAMP match.'''
+    secs = timegm(time.strptime(match[1], "%Y-%m-%dT%H:%M:%S"))
+    return secs, int((match[2] or "").ljust(9, "0"))
+
+
+class LogOverlap(object):
+    '''Drops the lines a follow-mode poll repeats from earlier polls.
+
+    Polls ask for timestamped lines (timestamps=true) since the newest
+    timestamp seen so far. The controller includes lines logged at exactly
+    that time, so those, and only those, can be repeats: a poll drops as
+    many of them as were seen before. Any other line is passed on, as are
+    lines without a timestamp, so nothing is lost. With strip the
+    timestamp is taken off the lines passed on.
+    '''
+    def __init__(self, strip=False):
+        self.strip = strip
+        self.last = None
+        self._at_last = Counter()
+        self._since = None
+        self._skip = Counter()
+
+    def start(self):
+        self._since = self.last
+        self._skip = Counter(self._at_last)
+
+    def feed(self, line):
+        '''line as it should be passed on, or None for a repeat.'''
+        m = TIMESTAMP.match(line)
+        if m is None:
+            return line
+        t = log_time(m)
+        if t == self._since and self._skip[line]:
+            self._skip[line] -= 1
+            return None
+        if self.last is None or t > self.last:
+            self.last = t
+            self._at_last = Counter()
+        if t == self.last:
+            self._at_last[line] += 1
+        return line[m.end():] if self.strip else line
+
+    def since(self, default):
+        '''The since for the next poll: the newest timestamp seen, or
+        default before there is one.'''
+        if self.last is None:
+            return default
+        return "{}.{:09d}".format(*self.last)
@@ -0,0 +1,138 @@
+import threading
+from bisect import bisect_left
+
+# path parameters after the first segment of each controller endpoint;
+# anything beyond the listed names is folded into the last one
+TEMPLATES = {
+    "active": ["{id}", "logs", "{node}"],
+    "nodes": ["{node}"],
+    "create": ["{name}"],
+    "start": ["{id}"],
+    "stop": ["{id}"],
+    "images": ["{name}"],
+    "profiles": ["{resource}", "{name}"],
+    "auth": ["{type}", "{resource}"],
+}
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def endpoint_template(path):
+    '''"/active/12/logs/node-1?tail=5" -> "/active/{id}/logs/{node}"'''
+    parts = path.split("?")[0].strip("/").split("/")
+    names = TEMPLATES.get(parts[0], [])
+    ret = [parts[0]]
+    for i,p in enumerate(parts[1:]):
+        if i >= len(names):
+            break
+        ret.append(names[i])
+    return "/" + "/".join(ret)
+
+
+class EndpointStats(object):
+    __slots__ = ("count", "errors", "statuses", "sent", "received",
+                 "seconds", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = dict()
+        self.sent = 0
+        self.received = 0
+        self.seconds = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def json(self):
+        return {"count": self.count,
+                "errors": self.errors,
+                "statuses": dict(self.statuses),
+                "bytes_sent": self.sent,
+                "bytes_received": self.received,
+                "seconds": self.seconds,
+                "max_seconds": self.max,
+                "buckets": dict(zip(BUCKETS + ("+Inf",), self.buckets))}
+
+
+class ClientMetrics(object):
+    '''Request counts, status codes, bytes and latency histograms per
+    (method, endpoint template), recorded by Client._call. Requests
+    answered from the response cache are counted too, with their (near
+    zero) latency. Exceptions are counted under their class name.
+    '''
+    def __init__(self):
+        self._stats = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, op, path, res, seconds, data=None, received=None):
+        '''Count one request; received is the body size when res.content
+        should not be read, as for a stream.'''
+        key = (op, endpoint_template(path))
+        if isinstance(res, Exception):
+            status = type(res).__name__
+            received = 0
+        else:
+            status = str(res.status_code)
+            if received is None:
+                received = len(res.content or b"")
+        with self._lock:
+            st = self._stats.get(key)
+            if st is None:
+                st = self._stats[key] = EndpointStats()
+            st.count += 1
+            if isinstance(res, Exception) or res.status_code >= 400:
+                st.errors += 1
+            st.statuses[status] = st.statuses.get(status, 0) + 1
+            st.sent += len(data.encode() if isinstance(data, str) else data) if data else 0
+            st.received += received
+            st.seconds += seconds
+            st.max = max(st.max, seconds)
+            st.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def json(self):
+        with self._lock:
+            return { f"{op} {tmpl}": st.json()
+                     for (op,tmpl),st in sorted(self._stats.items()) }
+
+    def __str__(self):
+        rows = [f"{'Method': <7}{'Endpoint': <30}{'Count': >8}{'Errors': >8}"
+                f"{'Avg ms': >10}{'Max ms': >10}{'Total s': >10}{'KiB in': >10}"]
+        with self._lock:
+            stats = sorted(self._stats.items(), key=lambda i: -i[1].seconds)
+            for (op,tmpl),st in stats:
+                rows.append(f"{op: <7}{tmpl: <30}{st.count: >8}{st.errors: >8}"
+                            f"{st.seconds / st.count * 1000: >10.1f}{st.max * 1000: >10.1f}"
+                            f"{st.seconds: >10.2f}{st.received / 1024: >10.1f}")
+        return "\n".join(rows)
+
+    def prometheus(self, prefix="janus_client"):
+        '''The metrics in Prometheus text exposition format.'''
+        with self._lock:
+            stats = sorted(self._stats.items())
+            out = [f"# HELP {prefix}_requests_total Controller requests by endpoint and status.",
+                   f"# TYPE {prefix}_requests_total counter"]
+            for (op,tmpl),st in stats:
+                for status,n in sorted(st.statuses.items()):
+                    out.append(f'{prefix}_requests_total{{method="{op}",endpoint="{tmpl}",'
+                               f'status="{status}"}} {n}')
+            out += [f"# HELP {prefix}_request_bytes_total Request and response body bytes.",
+                    f"# TYPE {prefix}_request_bytes_total counter"]
+            for (op,tmpl),st in stats:
+                for direction,n in (("sent", st.sent), ("received", st.received)):
+                    out.append(f'{prefix}_request_bytes_total{{method="{op}",endpoint="{tmpl}",'
+                               f'direction="{direction}"}} {n}')
+            out += [f"# HELP {prefix}_request_seconds Controller request latency.",
+                    f"# TYPE {prefix}_request_seconds histogram"]
+            for (op,tmpl),st in stats:
+                labels = f'method="{op}",endpoint="{tmpl}"'
+                total = 0
+                for le,n in zip(BUCKETS + ("+Inf",), st.buckets):
+                    total += n
+                    out.append(f'{prefix}_request_seconds_bucket{{{labels},le="{le}"}} {total}')
+                out.append(f"{prefix}_request_seconds_sum{{{labels}}} {st.seconds}")
+                out.append(f"{prefix}_request_seconds_count{{{labels}}} {st.count}")
+        return "\n".join(out) + "\n"
@@ -0,0 +1,167 @@
+from collections import defaultdict
+
+
+class Endpoint(object):
+    __slots__ = ("host", "port", "user")
+
+    def __init__(self, host, port, user=None):
+        self.host = host
+        self.port = port
+        self.user = user
+
+    def __str__(self):
+        return "{}:{}".format(self.host, self.port)
+
+
+class ServiceInstance(object):
+    '''One container of an allocation, from a manifest services entry.'''
+    __slots__ = ("node", "image", "profile", "errors", "endpoint",
+                 "container_id", "data_ipv4", "raw")
+
+    def __init__(self, node, data):
+        self.node = node
+        self.image = data.get('image')
+        self.profile = data.get('profile')
+        self.errors = data.get('errors')
+        self.container_id = data.get('container_id')
+        self.data_ipv4 = data.get('data_ipv4')
+        self.endpoint = None
+        if data.get('ctrl_host') and data.get('ctrl_port'):
+            self.endpoint = Endpoint(data['ctrl_host'], data['ctrl_port'],
+                                     data.get('container_user'))
+        self.raw = data
+
+
+class Allocation(object):
+    '''A session as returned by the controller (active/create/start).'''
+    __slots__ = ("id", "name", "state", "user", "nodes", "instances",
+                 "request", "raw")
+
+    def __init__(self, data):
+        self.id = str(data['id'])
+        self.name = data.get('name')
+        self.state = data.get('state')
+        self.user = data.get('user')
+        self.request = data.get('request', [])
+        self.instances = [ ServiceInstance(node, s)
+                           for node,svcs in data.get('services', {}).items()
+                           for s in svcs ]
+        self.nodes = frozenset(data.get('allocations') or
+                               [ i.node for i in self.instances ])
+        self.raw = data
+
+    def __repr__(self):
+        return "<Allocation {} {} {}>".format(self.id, self.state, sorted(self.nodes))
+
+    @property
+    def images(self):
+        return { i.image for i in self.instances }
+
+    @property
+    def profiles(self):
+        return { i.profile for i in self.instances }
+
+    @property
+    def errors(self):
+        return any(i.errors for i in self.instances)
+
+    def services(self, node):
+        return [ i for i in self.instances if i.node == node ]
+
+
+class Inventory(object):
+    '''Allocations keyed by id, with secondary indexes by node name,
+    state and image kept up to date by add() and remove().
+
+    Accepts any of the shapes the controller and the CLI use: a list of
+    allocations, a list of {id: allocation} dicts or one {id: allocation}
+    dict (a manifest).
+    '''
+    def __init__(self, data=None):
+        self._by_id = dict()
+        self._by_node = defaultdict(set)
+        self._by_state = defaultdict(set)
+        self._by_image = defaultdict(set)
+        if data:
+            self.update(data)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, aid):
+        return str(aid) in self._by_id
+
+    @staticmethod
+    def _items(data):
+        if isinstance(data, dict):
+            data = [data]
+        for d in data:
+            if 'id' in d:
+                yield d
+                continue
+            for k,v in d.items():
+                yield v if 'id' in v else dict(v, id=k)
+
+    def update(self, data):
+        for d in self._items(data):
+            self.add(d)
+
+    def add(self, data):
+        alloc = data if isinstance(data, Allocation) else Allocation(data)
+        self.remove(alloc.id)
+        self._by_id[alloc.id] = alloc
+        for n in alloc.nodes:
+            self._by_node[n].add(alloc.id)
+        self._by_state[alloc.state].add(alloc.id)
+        for img in alloc.images:
+            self._by_image[img].add(alloc.id)
+        return alloc
+
+    def remove(self, aid):
+        alloc = self._by_id.pop(str(aid), None)
+        if not alloc:
+            return None
+        for idx,keys in ((self._by_node, alloc.nodes),
+                         (self._by_state, [alloc.state]),
+                         (self._by_image, alloc.images)):
+            for k in keys:
+                idx[k].discard(alloc.id)
+                if not idx[k]:
+                    del idx[k]
+        return alloc
+
+    def get(self, aid):
+        return self._by_id.get(str(aid))
+
+    def _lookup(self, idx, keys):
+        sets = sorted((idx.get(k, set()) for k in keys), key=len)
+        if not sets:
+            return []
+        ids = sets[0].intersection(*sets[1:])
+        # numeric ids in numeric order
+        return [ self._by_id[i] for i in sorted(ids, key=lambda i: (len(i), i)) ]
+
+    def with_nodes(self, *nodes):
+        '''Allocations that contain every one of the given nodes.'''
+        return self._lookup(self._by_node, nodes)
+
+    def with_state(self, state):
+        return self._lookup(self._by_state, [state])
+
+    def with_image(self, image):
+        return self._lookup(self._by_image, [image])
+
+    @property
+    def nodes(self):
+        return self._by_node.keys()
+
+    @property
+    def states(self):
+        return self._by_state.keys()
+
+    @property
+    def images(self):
+        return self._by_image.keys()
@@ -0,0 +1,91 @@
+import time
+import random
+import threading
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, remaining):
+        self.remaining = remaining
+        super().__init__("Controller unavailable, circuit open for another {:.1f}s".format(remaining))
+
+
+class RetryPolicy(object):
+    '''Exponential backoff with full jitter for idempotent requests.
+
+    Requests whose method is in methods are retried up to retries times
+    after a connection error, a timeout or a status in statuses. The n-th
+    retry sleeps a random time in [0, min(max_backoff, backoff * 2**n)],
+    or the controller's Retry-After if that is longer.
+    '''
+    IDEMPOTENT = ("GET", "PUT", "DELETE")
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=10, jitter=True,
+                 statuses=(502, 503, 504), methods=IDEMPOTENT):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+
+    def delays(self, op):
+        if op not in self.methods:
+            return
+        for n in range(self.retries):
+            delay = min(self.max_backoff, self.backoff * 2 ** n)
+            yield random.uniform(0, delay) if self.jitter else delay
+
+    def retry_status(self, res):
+        return res.status_code in self.statuses
+
+    def delay_for(self, res, delay):
+        try:
+            after = float(res.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return delay
+        return max(delay, min(after, self.max_backoff))
+
+
+class CircuitBreaker(object):
+    '''Fail fast while the controller is down.
+
+    After threshold consecutive failures (connection errors or 5xx) the
+    circuit opens and calls raise CircuitOpenError without touching the
+    network. Once reset_timeout has passed a single trial call is let
+    through: success closes the circuit, failure opens it again.
+    '''
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened is None:
+            return "closed"
+        if time.monotonic() - self._opened >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        with self._lock:
+            if self._opened is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened)
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(max(remaining, 0))
+            self._trial = True
+
+    def record(self, ok):
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.failures = 0
+                self._opened = None
+                return
+            self.failures += 1
+            if self._opened is not None or self.failures >= self.threshold:
+                self._opened = time.monotonic()
@@ -0,0 +1,121 @@
+import os
+import shlex
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+
+log = logging.getLogger(__name__)
+
+SSH_OPTIONS = ["-o", "StrictHostKeyChecking=no"]
+# seconds an idle master connection is kept after its last client exits
+PERSIST = 600
+
+
+class SSHMux(object):
+    '''Shared ssh connections to container endpoints.
+
+    Every ssh/scp built here uses OpenSSH connection multiplexing with
+    one ControlMaster socket per (host, port, user). The first command
+    to a target opens the master connection, later commands reuse it
+    and skip the handshake. An idle master exits after persist seconds.
+    close() stops the masters started so far from taking new sessions
+    and removes the private socket directory; sessions still open on a
+    master, e.g. in tmux panes, run on until they exit.
+    '''
+    def __init__(self, control_dir=None, persist=PERSIST, options=None):
+        self.control_dir = control_dir
+        self.persist = persist
+        self.options = SSH_OPTIONS if options is None else list(options)
+        self._own_dir = control_dir is None
+        self._masters = dict()
+        self._lock = threading.Lock()
+
+    def _dir(self):
+        if self.control_dir is None:
+            # mkdtemp gives a 0700 directory; kept short for the unix
+            # socket path limit
+            self.control_dir = tempfile.mkdtemp(prefix="janus-ssh-")
+        return self.control_dir
+
+    def control_path(self, host, port=None, user=None):
+        key = (host, str(port) if port else None, user)
+        with self._lock:
+            path = self._masters.get(key)
+            if path is None:
+                name = hashlib.sha1(f"{user}@{host}:{port}".encode()).hexdigest()[:16]
+                path = self._masters[key] = os.path.join(self._dir(), name)
+        return path
+
+    def mux_options(self, host, port=None, user=None):
+        return ["-o", "ControlMaster=auto",
+                "-o", f"ControlPath={self.control_path(host, port, user)}",
+                "-o", f"ControlPersist={self.persist}"] + self.options
+
+    def ssh_args(self, host, port=None, user=None, cmd=None, keypath=None, flags=()):
+        '''ssh argv running cmd (a string or list, or None for a login
+        shell) on host through its master connection.'''
+        ret = ["ssh"] + list(flags) + self.mux_options(host, port, user)
+        if keypath:
+            ret += ["-i", keypath]
+        if port:
+            ret += ["-p", str(port)]
+        if user:
+            ret += ["-l", user]
+        ret.append(host)
+        if cmd:
+            ret += cmd.split(" ") if isinstance(cmd, str) else list(cmd)
+        return ret
+
+    def ssh_command(self, host, port=None, user=None, cmd=None, keypath=None, flags=()):
+        '''ssh_args() as one shell command line, e.g. for a tmux pane. A
+        string cmd is passed on as is.'''
+        args = self.ssh_args(host, port, user, keypath=keypath, flags=flags)
+        line = shlex.join(args)
+        if cmd:
+            line += " " + (cmd if isinstance(cmd, str) else shlex.join(cmd))
+        return line
+
+    def scp_args(self, host, port, user, srcs, dst, keypath=None, flags=("-q",)):
+        '''scp argv copying local srcs to dst on host.'''
+        ret = ["scp"] + list(flags) + self.mux_options(host, port, user)
+        if keypath:
+            ret += ["-i", keypath]
+        if port:
+            ret += ["-P", str(port)]
+        target = f"{user}@{host}" if user else host
+        return ret + list(srcs) + [f"{target}:{dst}"]
+
+    def _control(self, op, key, path, timeout=5):
+        host, port, user = key
+        args = ["ssh", "-o", f"ControlPath={path}", "-O", op]
+        if port:
+            args += ["-p", port]
+        if user:
+            args += ["-l", user]
+        try:
+            return subprocess.run(args + [host], stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL, timeout=timeout).returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+
+    def masters(self):
+        '''(host, port, user) of the targets with a live master connection.'''
+        with self._lock:
+            items = list(self._masters.items())
+        return [ k for k,p in items if os.path.exists(p) and self._control("check", k, p) ]
+
+    def close(self):
+        with self._lock:
+            items = list(self._masters.items())
+            self._masters.clear()
+        for key,path in items:
+            if os.path.exists(path):
+                log.debug(f"Stopping ssh master for {key}")
+                # "exit" would also drop the sessions still running on it
+                self._control("stop", key, path)
+        if self._own_dir and self.control_dir:
+            shutil.rmtree(self.control_dir, ignore_errors=True)
+            self.control_dir = None
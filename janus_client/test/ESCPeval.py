@@ -1,5 +1,5 @@
-import os
 import sys
+import glob
 import time
 import logging
 import subprocess
@@ -8,6 +8,7 @@ from IPython.display import display
 import ipywidgets as widgets
 from subprocess import PIPE, STDOUT
 from ipaddress import IPv4Network, IPv4Address
+from janus_client.sshmux import SSHMux
 
 
 logging.basicConfig(stream=sys.stdout,
@@ -15,19 +16,18 @@ logging.basicConfig(stream=sys.stdout,
                     level=logging.INFO)
 log = logging.getLogger("ESCPeval")
 
+# repeated commands and copies to an endpoint share one ssh connection;
+# call mux.close() when done with the sessions
+mux = SSHMux()
+
+def _target(host):
+    parts = host.split(":")
+    return parts[0], parts[1] if len(parts) > 1 else None
+
 def run_host_cmd(host, user, cmd, interactive=False, out=None, keypath=None):
     log.debug(f"Running \"{cmd}\" on \"{host}\"")
-    init_cmd = ["ssh", "-q", "-tt", "-o", "StrictHostKeyChecking=no"]
-    if keypath:
-        init_cmd += ["-i", keypath]
-    hstr = host
-    parts = host.split(":")
-    if len(parts) > 1:
-        hstr = parts[0]
-        init_cmd += ["-p", parts[1]]
-    if user:
-        hstr = f"{user}@{hstr}"
-    rcmd = init_cmd + [hstr] + cmd.split(" ")
+    hstr, port = _target(host)
+    rcmd = mux.ssh_args(hstr, port, user, cmd, keypath=keypath, flags=["-q", "-tt"])
     log.debug(rcmd)
     #print (rcmd)
     proc = subprocess.Popen(rcmd, stdout=PIPE, stderr=STDOUT, stdin=PIPE)
@@ -64,11 +64,13 @@ def setup(sess, user=None, keypath=None):
         cmd = "echo -e '[escp]\ndtn_path = /usr/local/bin/dtn\ndtn_args = -t 16 -b 8M' | sudo tee /etc/escp.conf"
         run_host_cmd(ep, sess.user, cmd, keypath=sess.keypath)
         
-        parts = ep.split(":")
-        cmd = f"scp -o StrictHostKeyChecking=no -q -i {sess.keypath} -P {parts[1]} {sess.keypath} {sess.user}@{parts[0]}:/config/.ssh/id_rsa"
-        ret = os.system(cmd)
-        cmd = f"scp -o StrictHostKeyChecking=no -q -i {sess.keypath} -P {parts[1]} scripts/* {sess.user}@{parts[0]}:/config/"
-        ret = os.system(cmd)
+        hstr, port = _target(ep)
+        cmd = mux.scp_args(hstr, port, sess.user, [sess.keypath], "/config/.ssh/id_rsa",
+                           keypath=sess.keypath)
+        ret = subprocess.call(cmd)
+        cmd = mux.scp_args(hstr, port, sess.user, glob.glob("scripts/*"), "/config/",
+                           keypath=sess.keypath)
+        ret = subprocess.call(cmd)
 
 # simple sequential jobs for ESCP eval
 def run_job(sess, source, **kwargs):
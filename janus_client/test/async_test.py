@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from janus_client import NodeResponse
+
+
+def test_async_nodes(make_async_client):
+    async def run():
+        async with make_async_client() as client:
+            return await asyncio.gather(*[client.nodes() for _ in range(20)])
+
+    res = asyncio.run(run())
+    assert len(res) == 20
+    for r in res:
+        assert isinstance(r, NodeResponse)
+        assert not r.error()
+        assert len(r.json()) == 10
+        assert str(r).startswith("node-0")
+
+
+def test_async_stream_logs(make_async_client):
+    async def run():
+        async with make_async_client() as client:
+            aid = next(iter((await client.create([{"instances": ["node-0"], "image": "x"}])).json()))
+            follow = client.stream_logs(aid, "node-0", follow=True, interval=0.05)
+            lines = [await follow.__anext__()]
+            await client.start(aid)
+            lines.append(await follow.__anext__())
+            await client.stop(aid)
+            await client.start(aid)
+            lines += [await follow.__anext__(), await follow.__anext__()]
+            await follow.aclose()
+            return aid, lines
+
+    aid, lines = asyncio.run(run())
+    assert lines == [f"created session {aid}", "started", "stopped", "started"]
@@ -0,0 +1,43 @@
+from fake_controller import API_PREFIX
+from janus_client import ResponseCache
+
+
+def test_cache_ttl_and_invalidate(fake_controller, make_client):
+    client = make_client(cache=True)
+    hits = fake_controller.hits
+    for _ in range(5):
+        assert len(client.nodes().json()) == 10
+    assert hits[("GET", f"{API_PREFIX}/nodes")] == 1
+
+    client.nodes(refresh=True)
+    assert hits[("GET", f"{API_PREFIX}/nodes")] == 2
+    client.nodes()
+    assert hits[("GET", f"{API_PREFIX}/nodes")] == 2
+
+    client.add_node({"name": "new"})
+    client.nodes()
+    assert hits[("GET", f"{API_PREFIX}/nodes")] == 3
+
+
+def test_cache_revalidate(fake_controller, make_client):
+    cache = ResponseCache(ttl={"nodes": 0})
+    client = make_client(cache=cache)
+    first = client.nodes()
+    second = client.nodes()
+    # both requests hit the controller, the second one answered with 304
+    assert fake_controller.hits[("GET", f"{API_PREFIX}/nodes")] == 2
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_cache_lru():
+    class Res(object):
+        status_code = 200
+        headers = {}
+
+    cache = ResponseCache(maxsize=2)
+    for name in ("a", "b", "c"):
+        cache.store("images", f"http://x/images/{name}", Res())
+    assert len(cache) == 2
+    assert cache.lookup("images", "http://x/images/a")[0] is None
+    assert cache.lookup("images", "http://x/images/c")[0] is not None
@@ -0,0 +1,87 @@
+"""
+Cold-start benchmark for the januscli module.
+
+Runs `python -X importtime -c "import januscli.januscli"` in fresh
+interpreters and reports the median cumulative import time together with
+the slowest imports. Fails (exit status 1) when the median is over
+--max-ms, or when a module that januscli only needs for some commands
+(docopt, pprint, libtmux, ptyprocess, pygments, zx, aiohttp) is imported
+at startup.
+
+    python cli_import_bench.py --runs 10 --max-ms 250
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODULE = "januscli.januscli"
+DEFERRED = ["docopt", "pprint", "libtmux", "ptyprocess", "pygments", "zx", "aiohttp"]
+
+
+def env():
+    ret = dict(os.environ)
+    path = [ROOT, os.path.join(ROOT, "cli")]
+    if ret.get("PYTHONPATH"):
+        path.append(ret["PYTHONPATH"])
+    ret["PYTHONPATH"] = os.pathsep.join(path)
+    return ret
+
+
+def importtime():
+    '''{module: (self us, cumulative us)} for one cold import.'''
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+                         env=env(), capture_output=True, text=True, check=True).stderr
+    ret = dict()
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if not parts[0].strip().isdigit():
+            continue
+        ret[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return ret
+
+
+def loaded():
+    code = f"import sys, {MODULE}; print(' '.join(sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], env=env(),
+                         capture_output=True, text=True, check=True).stdout
+    mods = set(out.split())
+    return [ m for m in DEFERRED if m in mods ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=250.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [ importtime() for _ in range(args.runs) ]
+    totals = [ r[MODULE][1] / 1000 for r in runs ]
+    median = statistics.median(totals)
+    print(f"{MODULE}: median {median:.1f} ms, min {min(totals):.1f} ms, "
+          f"max {max(totals):.1f} ms over {args.runs} runs")
+
+    print("\nslowest imports (cumulative ms, median run):")
+    mid = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    for name,(_,cum) in sorted(mid.items(), key=lambda i: -i[1][1])[:args.top]:
+        print(f"  {cum / 1000: >8.1f}  {name}")
+
+    failed = False
+    eager = loaded()
+    if eager:
+        print(f"\nFAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if median > args.max_ms:
+        print(f"\nFAIL: median {median:.1f} ms over the {args.max_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Client benchmark suite against the in-process fake controller.
+
+Reports throughput and p50/p99 latency for:
+
+    lifecycle   create -> start -> stop -> delete of a one-node session
+    sync-nodes  full GET /nodes of a large fleet
+    sync-active full GET /active of a large session list
+
+    python client_bench.py
+    python client_bench.py --flows 500 --workers 8 --fleet 10000 --latency 0.001
+    python client_bench.py --only lifecycle --error-rate 0.01
+"""
+
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from janus_client import Client
+from fake_controller import FakeController
+
+
+def percentile(samples, pct):
+    s = sorted(samples)
+    idx = min(len(s) - 1, int(round(pct / 100 * (len(s) - 1))))
+    return s[idx]
+
+
+def report(name, samples, elapsed, errors=0):
+    if not samples:
+        print(f"{name: <12} no successful samples ({errors} errors)")
+        return
+    print(f"{name: <12}{len(samples): >8}{len(samples) / elapsed: >12.1f}"
+          f"{percentile(samples, 50) * 1000: >10.2f}{percentile(samples, 99) * 1000: >10.2f}"
+          f"{errors: >8}")
+
+
+def run(fn, n, workers):
+    '''Run fn n times on workers threads, returning (latencies, elapsed, errors).'''
+    def timed(_):
+        t = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            return None
+        return time.perf_counter() - t
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        res = list(pool.map(timed, range(n)))
+    elapsed = time.perf_counter() - start
+    samples = [r for r in res if r is not None]
+    return samples, elapsed, len(res) - len(samples)
+
+
+def lifecycle(client, node):
+    req = [{"instances": [node], "image": "dtnaas/tools",
+            "profile": "default", "kwargs": {}}]
+    ret = client.create(req)
+    if ret.error():
+        raise Exception(ret)
+    aid = next(iter(ret.json()))
+    for op in (client.start, client.stop, client.delete):
+        if op(aid).error():
+            raise Exception(f"{op.__name__} {aid} failed")
+
+
+def sync(call):
+    ret = call()
+    if ret.error():
+        raise Exception(ret)
+    ret.json()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flows", type=int, default=200)
+    parser.add_argument("--syncs", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--fleet", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--only", choices=["lifecycle", "sync-nodes", "sync-active"])
+    args = parser.parse_args()
+
+    print(f"{'bench': <12}{'ops': >8}{'ops/s': >12}{'p50 ms': >10}{'p99 ms': >10}{'errors': >8}")
+    with FakeController(nodes=args.fleet, sessions=args.fleet,
+                        latency=args.latency, error_rate=args.error_rate) as fc:
+        client = Client(fc.url, auth=("admin", "admin"),
+                        pool_maxsize=max(10, args.workers))
+        if args.only in (None, "lifecycle"):
+            report("lifecycle", *run(lambda: lifecycle(client, "node-0"),
+                                     args.flows, args.workers))
+        if args.only in (None, "sync-nodes"):
+            report("sync-nodes", *run(lambda: sync(client.nodes),
+                                      args.syncs, args.workers))
+        if args.only in (None, "sync-active"):
+            report("sync-active", *run(lambda: sync(client.active),
+                                       args.syncs, args.workers))
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
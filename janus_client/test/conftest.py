@@ -1,4 +1,5 @@
 import pytest
+from janus_client import Service
 from janus_client.client import Client
 
 BASE_URL = "https://localhost:5000"
@@ -178,4 +179,51 @@ def new_exec_fixture(request, janus_client):
         }
         exec_resp = janus_client.exec_create(exec_request).json()
         exec_id = exec_resp.get("Id") or exec_resp.get("id")
-        yield (node_name, exec_id)
\ No newline at end of file
+        yield (node_name, exec_id)
+
+
+@pytest.fixture
+def fake_controller():
+    from fake_controller import FakeController
+    with FakeController() as fc:
+        yield fc
+
+
+@pytest.fixture
+def make_client(fake_controller):
+    '''Clients on the fake controller, with any further Client options.'''
+    made = list()
+
+    def make(**kwargs):
+        made.append(Client(fake_controller.url, auth=AUTH, **kwargs))
+        return made[-1]
+    yield make
+    for c in made:
+        c.close()
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+@pytest.fixture
+def make_async_client(fake_controller):
+    '''AsyncClients on the fake controller, to be opened inside the
+    test's event loop.'''
+    def make(**kwargs):
+        from janus_client import AsyncClient
+        return AsyncClient(fake_controller.url, auth=AUTH, **kwargs)
+    return make
+
+
+@pytest.fixture
+def make_session():
+    '''Sessions running dtnaas/tools on nodes, initialized on request.'''
+    def make(client, nodes, initialize=False, **kwargs):
+        sess = client.getSession(**kwargs)
+        sess.addService(Service(instances=nodes, image="dtnaas/tools", profile="default"))
+        if initialize:
+            sess.initialize()
+        return sess
+    return make
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from fake_controller import FakeController, API_PREFIX
+from janus_client.wait import ExecWaiter
+
+
+@pytest.fixture
+def fake_controller():
+    # execs that take a few polls to finish
+    with FakeController(exec_time=0.3) as fc:
+        yield fc
+
+
+def test_exec_run(client):
+    chunks = []
+    res = client.exec_run({"node": "node-0", "container": "abc", "Cmd": ["echo", "hi"]},
+                          timeout=5, callback=lambda n, e, out: chunks.append(out))
+    assert res.ok
+    assert res.exit_code == 0
+    assert res.output == "echo hi\n"
+    assert chunks == ["echo hi\n"]
+    # backoff keeps the number of polls well below a fixed 50ms loop
+    assert 2 <= res.polls <= 6
+
+
+def test_exec_wait_timeout(client):
+    eid = client.exec_create({"node": "node-0", "Cmd": ["sleep"]}).json()["Id"]
+    res = client.exec_wait("node-0", eid, timeout=0.1)
+    assert res.timed_out and not res.ok
+
+
+def test_exec_wait_all_budget(fake_controller, client):
+    targets = []
+    for i in range(10):
+        node = f"node-{i}"
+        targets.append((node, client.exec_create({"node": node, "Cmd": ["true"]}).json()["Id"]))
+    res = client.exec_wait_all(targets, timeout=5, budget=40)
+    assert all(r.ok for r in res)
+    assert [(r.node, r.exec_id) for r in res] == targets
+    assert sum(r.polls for r in res) == fake_controller.hits[("GET", f"{API_PREFIX}/exec")]
+
+
+def test_exec_wait_missing(client):
+    res = client.exec_wait("node-0", "nope", timeout=1)
+    assert res.error and not res.running
+
+
+def test_async_exec_run(make_async_client):
+    pytest.importorskip("aiohttp")
+
+    async def run():
+        async with make_async_client() as client:
+            return await client.exec_run({"node": "node-1", "Cmd": ["uname"]}, timeout=5)
+
+    res = asyncio.run(run())
+    assert res.ok and res.output == "uname\n"
+
+
+def test_exec_fleet(client, make_session):
+    sess = make_session(client, ["node-1", "node-2", "node-3"], initialize=True)
+    chunks = []
+    res = client.exec_fleet("sysctl -w net.core.rmem_max=1", session=sess, workers=2,
+                            timeout=5, callback=lambda n, e, out: chunks.append(n))
+    assert res.ok and len(res) == 3
+    assert sorted(chunks) == ["node-1", "node-2", "node-3"]
+    assert res.json()[0]["output"] == "sh -c sysctl -w net.core.rmem_max=1\n"
+
+    aid = next(iter(sess._manifest))
+    res = client.exec_fleet(["iperf3", "-s"], session=aid, nodes=["node-2"], timeout=0.1)
+    assert [ i[1].node for i in res.timed_out ] == ["node-2"]
+    assert not res.ok
+
+
+def test_exec_waiter_small_budget():
+    waiter = ExecWaiter([("node-0", "e1"), ("node-1", "e2")], budget=0.5)
+    # under one request per second still polls, one at a time
+    assert waiter.due() == [("node-0", "e1")]
+    assert waiter.due() == []
+    assert 1.5 < waiter.wait_time() <= 2
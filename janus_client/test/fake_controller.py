@@ -0,0 +1,342 @@
+"""
+In-process stand-in for a Janus controller.
+
+Implements the /api/janus/controller routes used by janus_client.Client
+(nodes, active, logs, create/start/stop/delete, exec, images, profiles,
+auth) against in-memory state, over HTTP/1.1 so keep-alive works.
+
+Knobs for benchmarks and tests:
+
+    latency     seconds added to every request, or a (min, max) range
+    error_rate  fraction of requests answered with a 503
+    nodes       number of nodes in the fleet
+    sessions    number of pre-existing sessions, spread over the nodes
+    exec_time   seconds an exec stays running before it completes
+
+    with FakeController(nodes=10000, latency=0.002) as fc:
+        client = Client(fc.url, auth=("admin", "admin"))
+"""
+
+import time
+import json
+import random
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PREFIX = "/api/janus/controller"
+
+IMAGES = ["dtnaas/tools", "dtnaas/gct", "dtnaas/ofed", "ubuntu:latest"]
+PROFILES = ["default", "bridge", "host", "sriov"]
+ROUTES = ("nodes", "active", "create", "start", "stop", "exec", "images",
+          "profiles", "auth")
+
+
+def _rfc3339(ns):
+    '''Docker's timestamps=true prefix for a time in nanoseconds.'''
+    secs, nanos = divmod(ns, 10**9)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(secs)) + f".{nanos:09d}Z"
+
+
+class FakeState(object):
+    def __init__(self, nodes, sessions, exec_time):
+        self.lock = threading.Lock()
+        self.exec_time = exec_time
+        self.nodes = dict()
+        for i in range(nodes):
+            self.add_node({"name": f"node-{i}",
+                           "url": f"tcp://10.0.{i // 250}.{i % 250}:2376",
+                           "type": 1})
+        self.images = [{"name": i} for i in IMAGES]
+        self.profiles = {"host": dict(), "network": dict(), "volume": dict()}
+        for p in PROFILES:
+            self.profiles["host"][p] = {"name": p, "settings": {"cpu": 4}}
+        self.active = dict()
+        self.logs = dict()
+        self.execs = dict()
+        self._aid = 0
+        self._port = 30000
+        names = list(self.nodes)
+        for i in range(sessions):
+            node = names[i % len(names)] if names else "local"
+            self.create([{"instances": [node],
+                          "image": IMAGES[i % len(IMAGES)],
+                          "profile": "default",
+                          "kwargs": {"USER_NAME": "janus"}}])
+
+    def add_node(self, data):
+        node = dict(data)
+        node["id"] = len(self.nodes) + 1
+        node.setdefault("name", f"node-{node['id']}")
+        self.nodes[node["name"]] = node
+        return node
+
+    def find_node(self, key):
+        if key in self.nodes:
+            return self.nodes[key]
+        return next((n for n in self.nodes.values() if str(n["id"]) == key), None)
+
+    def create(self, reqs, name=None):
+        self._aid += 1
+        aid = self._aid
+        services = dict()
+        for req in reqs:
+            for inst in req["instances"]:
+                self._port += 1
+                user = req.get("kwargs", {}).get("USER_NAME", "janus")
+                cid = hashlib.md5(f"{aid}-{inst}-{self._port}".encode()).hexdigest()
+                services.setdefault(inst, []).append({
+                    "ctrl_host": f"{inst}.example.net",
+                    "ctrl_port": str(self._port),
+                    "container_user": user,
+                    "container_id": cid[:12],
+                    "data_ipv4": f"192.168.{aid % 250}.{len(services) + 1}",
+                    "image": req.get("image"),
+                    "profile": req.get("profile"),
+                    "errors": []})
+        self.active[aid] = {"id": aid,
+                            "name": name or f"session-{aid}",
+                            "user": "admin",
+                            "state": "INITIALIZED",
+                            "allocations": list(services),
+                            "request": reqs,
+                            "services": services}
+        self.logs[aid] = [(time.time_ns(), f"created session {aid}")]
+        return {aid: self.active[aid]}
+
+    def set_state(self, aid, state):
+        alloc = self.active[aid]
+        alloc["state"] = state
+        self.logs[aid].append((time.time_ns(), state.lower()))
+        return {aid: alloc}
+
+    def exec_create(self, req):
+        eid = hashlib.md5(f"{req}-{len(self.execs)}".encode()).hexdigest()
+        self.execs[eid] = {"node": req.get("node"),
+                           "container": req.get("container"),
+                           "cmd": req.get("Cmd", []),
+                           "started": time.monotonic()}
+        return {"Id": eid}
+
+    def exec_status(self, node, eid):
+        ex = self.execs.get(eid)
+        if not ex or ex["node"] != node:
+            return None
+        running = time.monotonic() - ex["started"] < self.exec_time
+        return {"ID": eid,
+                "Running": running,
+                "ExitCode": None if running else 0,
+                "output": "" if running else "{}\n".format(" ".join(ex["cmd"]))}
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, code, body=None, text=None):
+        data = b""
+        ctype = "application/json"
+        if text is not None:
+            data = text.encode()
+            ctype = "text/plain"
+        elif body is not None:
+            data = json.dumps(body).encode()
+        etag = None
+        if self.command == "GET" and code == 200:
+            etag = '"{}"'.format(hashlib.md5(data).hexdigest())
+            if self.headers.get("If-None-Match") == etag:
+                code, data = 304, b""
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(n) if n else b""
+        return json.loads(data) if data else None
+
+    def _dispatch(self):
+        srv = self.server
+        url = urlsplit(self.path)
+        srv.hits[(self.command, url.path)] += 1
+        body = self._body()
+        if srv.latency:
+            time.sleep(random.uniform(*srv.latency))
+        if srv.error_rate and random.random() < srv.error_rate:
+            return self._reply(503, {"error": "injected failure"})
+        parts = [p for p in url.path[len(API_PREFIX):].split("/") if p]
+        if not url.path.startswith(API_PREFIX) or not parts or parts[0] not in ROUTES:
+            return self._reply(404, {"error": f"not found: {url.path}"})
+        handler = getattr(self, f"_{parts[0]}")
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with srv.state.lock:
+            ret = handler(srv.state, parts[1:], query, body)
+        if isinstance(ret, tuple):
+            self._reply(*ret)
+        else:
+            self._reply(200, ret)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def _nodes(self, st, args, query, body):
+        if self.command == "POST":
+            return st.add_node(body)
+        if not args:
+            return list(st.nodes.values())
+        node = st.find_node(args[0])
+        if not node:
+            return 404, {"error": f"node {args[0]} not found"}
+        if self.command == "DELETE":
+            del st.nodes[node["name"]]
+        return node
+
+    def _active(self, st, args, query, body):
+        if not args:
+            return list(st.active.values())
+        try:
+            aid = int(args[0])
+        except ValueError:
+            return [a for a in st.active.values() if args[0] in (a["user"], a["name"])]
+        if aid not in st.active:
+            return 404, {"error": f"session {aid} not found"}
+        if self.command == "DELETE":
+            return {aid: st.active.pop(aid)}
+        if len(args) >= 3 and args[1] == "logs":
+            return self._logs(st.logs[aid], query)
+        return st.active[aid]
+
+    def _logs(self, lines, query):
+        # like Docker, since takes fractional seconds and includes lines
+        # logged at exactly that time
+        if "since" in query:
+            secs, _, frac = query["since"].partition(".")
+            since = int(secs) * 10**9 + int(frac[:9].ljust(9, "0"))
+            lines = [l for l in lines if l[0] >= since]
+        if "tail" in query and query["tail"] != "all":
+            lines = lines[-int(query["tail"]):]
+        if query.get("timestamps") in ("1", "true"):
+            return 200, None, "".join(f"{_rfc3339(t)} {l}\n" for t,l in lines)
+        return 200, None, "".join(f"{l}\n" for t,l in lines)
+
+    def _create(self, st, args, query, body):
+        for req in body:
+            missing = [ i for i in req.get("instances", []) if i not in st.nodes ]
+            if missing:
+                return 404, {"error": f"unknown nodes: {', '.join(missing)}"}
+        return st.create(body, args[0] if args else None)
+
+    def _start(self, st, args, query, body):
+        if int(args[0]) not in st.active:
+            return 404, {"error": f"session {args[0]} not found"}
+        return st.set_state(int(args[0]), "STARTED")
+
+    def _stop(self, st, args, query, body):
+        if int(args[0]) not in st.active:
+            return 404, {"error": f"session {args[0]} not found"}
+        return st.set_state(int(args[0]), "STOPPED")
+
+    def _exec(self, st, args, query, body):
+        if self.command == "POST":
+            return st.exec_create(body)
+        ret = st.exec_status(query.get("node"), query.get("exec_id"))
+        if ret is None:
+            return 404, {"error": "exec not found"}
+        return ret
+
+    def _images(self, st, args, query, body):
+        if not args:
+            return st.images
+        img = next((i for i in st.images if i["name"] == "/".join(args)), None)
+        return img if img else (404, {"error": "image not found"})
+
+    def _profiles(self, st, args, query, body):
+        if not args:
+            return [p for res in st.profiles.values() for p in res.values()]
+        if args[0] not in st.profiles:
+            return 404, {"error": f"unknown resource {args[0]}"}
+        res = st.profiles[args[0]]
+        if len(args) == 1:
+            return list(res.values())
+        name = args[1]
+        if self.command in ("POST", "PUT"):
+            res[name] = {"name": name, "settings": body.get("settings", {})}
+        elif name not in res:
+            return 404, {"error": f"profile {name} not found"}
+        elif self.command == "DELETE":
+            return res.pop(name)
+        return res[name]
+
+    def _auth(self, st, args, query, body):
+        return body
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeController(object):
+    def __init__(self, host="127.0.0.1", port=0, nodes=10, sessions=0,
+                 latency=0, error_rate=0, exec_time=0, ssl_context=None):
+        self._server = FakeServer((host, port), FakeHandler)
+        if ssl_context:
+            self._server.socket = ssl_context.wrap_socket(self._server.socket,
+                                                          server_side=True)
+        self._server.hits = Counter()
+        self._server.state = FakeState(nodes, sessions, exec_time)
+        self.latency = latency
+        self.error_rate = error_rate
+        self._thread = None
+        scheme = "https" if ssl_context else "http"
+        self.url = f"{scheme}://{host}:{self._server.server_address[1]}"
+
+    @property
+    def hits(self):
+        return self._server.hits
+
+    @property
+    def state(self):
+        return self._server.state
+
+    @property
+    def latency(self):
+        return self._server.latency
+
+    @latency.setter
+    def latency(self, value):
+        if value and not isinstance(value, (tuple, list)):
+            value = (value, value)
+        self._server.latency = value
+
+    @property
+    def error_rate(self):
+        return self._server.error_rate
+
+    @error_rate.setter
+    def error_rate(self, value):
+        self._server.error_rate = value
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
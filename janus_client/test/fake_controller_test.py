@@ -0,0 +1,136 @@
+"""
+Exercises the Client API end to end against the in-process fake
+controller, so it runs without a live Janus deployment.
+"""
+
+import json
+import pytest
+from janus_client import Service, SessionError, set_decoder
+from janus_client.client import Response
+
+
+def test_nodes(client):
+    assert len(client.nodes().json()) == 10
+    assert client.nodes(node="node-3").json()["name"] == "node-3"
+    client.add_node({"name": "extra", "url": "tcp://10.1.1.1:2376", "type": 1})
+    assert "extra" in str(client.nodes())
+    assert not client.delete_node(node="extra").error()
+    assert client.nodes(node="extra").error()
+
+
+def test_session_lifecycle(client):
+    sess = client.getSession(workers=4)
+    sess.addService(Service(instances=["node-1", "node-2"], image="dtnaas/tools",
+                            profile="default", username="janus", public_key="ssh-rsa"))
+    sess.start()
+    assert sess._state == "STARTED"
+    eps = sess.endpoints().json()
+    assert set(eps) == {"node-1", "node-2"}
+    status = sess.status().json()
+    assert status[0]["state"] == "STARTED"
+    sess.stop()
+    assert sess._state == "STOPPED"
+    sess.destroy()
+    assert client.active().json() == []
+
+
+def test_session_errors(fake_controller, client):
+    sess = client.getSession()
+    sess._manifest.update({"999": {"request": []}})
+    sess._state = "INITIALIZED"
+    with pytest.raises(SessionError) as e:
+        sess.start()
+    assert list(e.value.response.errors) == ["999"]
+
+
+def test_profiles_images(client):
+    assert "default" in str(client.profiles())
+    client.create_profile("network", "pytest-net", {"driver": "bridge"})
+    assert client.profiles("network", "pytest-net").json()["settings"]["driver"] == "bridge"
+    client.update_profile("network", "pytest-net", {"driver": "macvlan"})
+    assert client.profiles("network", "pytest-net").json()["settings"]["driver"] == "macvlan"
+    client.delete_profile("network", "pytest-net")
+    assert client.profiles("network", "pytest-net").error()
+    assert {"name": "dtnaas/tools"} in client.images().json()
+
+
+def test_exec(client):
+    eid = client.exec_create({"node": "node-0", "container": "abc",
+                              "Cmd": ["echo", "hi"]}).json()["Id"]
+    status = client.exec_status("node-0", eid).json()
+    assert status["ExitCode"] == 0
+    assert status["output"] == "echo hi\n"
+
+
+def test_injected_errors(fake_controller, client):
+    fake_controller.error_rate = 1
+    assert client.nodes().status_code == 503
+
+
+def test_stream_logs(client):
+    aid = next(iter(client.create([{"instances": ["node-0"], "image": "dtnaas/tools",
+                                    "profile": "default", "kwargs": {}}]).json()))
+    client.start(aid)
+    lines = list(client.stream_logs(aid, "node-0"))
+    assert len(lines) == 2 and lines[1].endswith("started")
+    assert list(client.stream_logs(aid, "node-0", tail=1)) == lines[1:]
+
+    follow = client.stream_logs(aid, "node-0", follow=True, interval=0.05)
+    assert [next(follow), next(follow)] == lines
+    client.stop(aid)
+    assert next(follow) == "stopped"
+    # a line repeating earlier output is still new
+    client.start(aid)
+    assert next(follow) == "started"
+    follow.close()
+
+
+def test_json_memoized(client):
+    calls = []
+
+    def loads(content):
+        calls.append(content)
+        return json.loads(content)
+
+    set_decoder(loads)
+    try:
+        res = client.nodes()
+        assert res.json() is res.json()
+        str(res)
+        assert len(calls) == 1
+    finally:
+        set_decoder()
+
+
+def test_json_decoder_fallback():
+    class Raw(object):
+        status_code = 200
+        content = b'{"load": NaN}'
+
+    def strict(content):
+        raise ValueError("strict decoder")
+
+    set_decoder(strict)
+    try:
+        assert str(Response(Raw()).json()) == "{'load': nan}"
+    finally:
+        set_decoder()
+
+
+def test_chunked_create(fake_controller, client, make_session):
+    sess = client.getSession(workers=4, chunk_size=3)
+    sess.addService(Service(instances=[f"node-{i}" for i in range(7)],
+                            image="dtnaas/tools", profile="default"))
+    sess.addService(Service(instances=["node-8"], image="dtnaas/gct", profile="default"))
+    ret = sess.initialize()
+    assert len(ret.results) == 3
+    assert fake_controller.hits[("POST", "/api/janus/controller/create")] == 3
+    assert sorted(sess.inventory().nodes) == sorted([f"node-{i}" for i in range(7)] + ["node-8"])
+    sess.destroy()
+
+    # a failed chunk rolls back the allocations of the others
+    sess = make_session(client, ["node-1", "node-2", "node-3", "bogus"],
+                        workers=4, chunk_size=2)
+    with pytest.raises(SessionError):
+        sess.initialize()
+    assert client.active().json() == []
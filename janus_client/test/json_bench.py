@@ -0,0 +1,86 @@
+"""
+Microbenchmark for Response JSON decoding over large synthetic manifests.
+
+Builds an /active listing of N sessions with the fake controller's state
+model and compares, for k .json() calls per response (as NodeResponse
+__str__, ActiveResponse.services and the CLI do):
+
+    redecode    decoding the body on every call, as Response used to
+    json        memoized Response.json() with the stdlib decoder
+    orjson      memoized Response.json() with orjson, if installed
+
+    python json_bench.py --sessions 10000 --calls 4
+"""
+
+import json
+import time
+import argparse
+from janus_client import set_decoder
+from janus_client.client import ActiveResponse
+from fake_controller import FakeState
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Raw(object):
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def redecode(raw, calls):
+    for _ in range(calls):
+        raw.json()
+
+
+def memoized(raw, calls):
+    res = ActiveResponse(raw)
+    for _ in range(calls):
+        res.json()
+
+
+def bench(fn, raw, calls, repeat):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(raw, calls)
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    state = FakeState(nodes=100, sessions=args.sessions, exec_time=0)
+    raw = Raw(json.dumps(list(state.active.values())).encode())
+    print(f"{args.sessions} sessions, {len(raw.content) / 2**20:.1f} MiB, "
+          f"{args.calls} .json() calls per response")
+
+    rows = [("redecode", bench(redecode, raw, args.calls, args.repeat))]
+    set_decoder(json.loads)
+    rows.append(("json", bench(memoized, raw, args.calls, args.repeat)))
+    if orjson:
+        set_decoder(orjson.loads)
+        rows.append(("orjson", bench(memoized, raw, args.calls, args.repeat)))
+    set_decoder()
+
+    base = rows[0][1]
+    print(f"{'decoder': <10}{'ms': >10}{'speedup': >10}")
+    for name, t in rows:
+        print(f"{name: <10}{t * 1000: >10.1f}{base / t: >9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+from janus_client.logs import LogOverlap, server_time
+
+
+def stamp(nanos, text):
+    return f"2026-10-18T00:00:00.{nanos:09d}Z {text}"
+
+
+def poll(overlap, lines):
+    overlap.start()
+    out = [ overlap.feed(l) for l in lines ]
+    return [ o for o in out if o is not None ]
+
+
+def test_overlap_dropped():
+    ov = LogOverlap(strip=True)
+    assert poll(ov, [stamp(1, "a"), stamp(2, "b"), stamp(2, "c")]) == ["a", "b", "c"]
+    assert ov.since(5) == "1792281600.000000002"
+    # the next poll starts with the lines logged at the time it asked for
+    assert poll(ov, [stamp(2, "b"), stamp(2, "c"), stamp(3, "d")]) == ["d"]
+    assert poll(ov, [stamp(3, "d")]) == []
+    assert poll(ov, []) == []
+    assert poll(ov, [stamp(4, "e"), stamp(5, "f")]) == ["e", "f"]
+
+
+def test_overlap_never_loses_lines():
+    ov = LogOverlap()
+    poll(ov, [stamp(1, "a"), stamp(2, "tick")])
+    # the same text logged again is new output
+    assert poll(ov, [stamp(2, "tick"), stamp(3, "tick")]) == [stamp(3, "tick")]
+    # as is a second line logged at the time asked for
+    assert poll(ov, [stamp(3, "tick"), stamp(3, "tick")]) == [stamp(3, "tick")]
+    assert poll(ov, [stamp(3, "tick"), stamp(3, "tick")]) == []
+    # lines out of order and without timestamps are passed on
+    assert poll(ov, [stamp(5, "x"), stamp(4, "y"), "z"]) == [stamp(5, "x"), stamp(4, "y"), "z"]
+
+
+def test_overlap_since():
+    ov = LogOverlap()
+    assert ov.since(5) == 5
+    poll(ov, ["no timestamp"])
+    assert ov.since(5) == 5
+
+
+def test_server_time():
+    assert server_time({"Date": "Sun, 18 Oct 2026 00:00:01 GMT"}, 5) == 1792281601.0
+    assert server_time({}, 5) == 5
+    assert server_time({"Date": "garbage"}, 5) == 5
@@ -0,0 +1,50 @@
+import pytest
+from janus_client import Client, ClientMetrics, ResponseCache
+from janus_client.metrics import endpoint_template
+
+
+def test_endpoint_template():
+    assert endpoint_template("/active") == "/active"
+    assert endpoint_template("/active/12?force=true") == "/active/{id}"
+    assert endpoint_template("/active/12/logs/node-1?tail=5") == "/active/{id}/logs/{node}"
+    assert endpoint_template("/images/dtnaas/tools") == "/images/{name}"
+    assert endpoint_template("/profiles/host/default") == "/profiles/{resource}/{name}"
+    assert endpoint_template("/exec?node=a&exec_id=b") == "/exec"
+
+
+def test_client_metrics(make_client):
+    client = make_client(metrics=True, cache=ResponseCache())
+    client.nodes()
+    client.nodes()
+    aid = next(iter(client.create([{"instances": ["node-1"], "image": "x"}]).json()))
+    client.start(aid)
+    client.active(Id=aid)
+    client.active(Id=9999)
+    stats = client.metrics.json()
+    assert stats["GET /nodes"]["count"] == 2
+    assert stats["PUT /start/{id}"]["count"] == 1
+    assert stats["POST /create"]["bytes_sent"] > 0
+    assert stats["GET /active/{id}"]["statuses"] == {"200": 1, "404": 1}
+    assert stats["GET /active/{id}"]["errors"] == 1
+
+    text = client.metrics.prometheus()
+    assert 'janus_client_requests_total{method="GET",endpoint="/nodes",status="200"} 2' in text
+    assert 'janus_client_request_seconds_count{method="PUT",endpoint="/start/{id}"} 1' in text
+    assert 'le="+Inf"} 2' in text
+    assert "/start/{id}" in str(client.metrics)
+
+
+def test_stream_metrics(make_client):
+    client = make_client(metrics=True)
+    aid = next(iter(client.create([{"instances": ["node-1"], "image": "x"}]).json()))
+    assert list(client.stream_logs(aid, "node-1")) == [f"created session {aid}"]
+    stats = client.metrics.json()["GET /active/{id}/logs/{node}"]
+    assert stats["count"] == 1
+    assert stats["bytes_received"] > 0
+
+
+def test_metrics_exceptions():
+    client = Client("http://127.0.0.1:1", metrics=ClientMetrics())
+    with pytest.raises(Exception):
+        client.nodes()
+    assert client.metrics.json()["GET /nodes"]["statuses"] == {"ConnectionError": 1}
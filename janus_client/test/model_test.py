@@ -0,0 +1,50 @@
+from fake_controller import FakeState
+from janus_client import Inventory, Allocation
+
+
+def make_state():
+    st = FakeState(nodes=20, sessions=0, exec_time=0)
+    for i in range(20):
+        st.create([{"instances": [f"node-{i}", f"node-{(i + 1) % 20}"],
+                    "image": "dtnaas/tools" if i % 2 else "dtnaas/gct",
+                    "profile": "default", "kwargs": {}}])
+    return st
+
+
+def test_allocation():
+    st = make_state()
+    a = Allocation(st.active[1])
+    assert a.id == "1"
+    assert a.nodes == {"node-0", "node-1"}
+    assert a.images == {"dtnaas/gct"}
+    assert str(a.services("node-1")[0].endpoint).startswith("node-1.example.net:")
+    assert not a.errors
+
+
+def test_inventory_shapes():
+    st = make_state()
+    listing = list(st.active.values())
+    cli = [{str(a["id"]): a} for a in listing]
+    manifest = {str(a["id"]): a for a in listing}
+    for data in (listing, cli, manifest):
+        inv = Inventory(data)
+        assert len(inv) == 20
+        assert "7" in inv and 7 in inv
+
+
+def test_inventory_indexes():
+    inv = Inventory(list(make_state().active.values()))
+    assert [a.id for a in inv.with_nodes("node-3")] == ["3", "4"]
+    assert [a.id for a in inv.with_nodes("node-3", "node-4")] == ["4"]
+    assert inv.with_nodes("node-3", "node-9") == []
+    assert len(inv.with_image("dtnaas/tools")) == 10
+    assert len(inv.with_state("INITIALIZED")) == 20
+
+    started = dict(inv.get(4).raw, state="STARTED")
+    inv.add(started)
+    assert [a.id for a in inv.with_state("STARTED")] == ["4"]
+    assert len(inv.with_state("INITIALIZED")) == 19
+
+    inv.remove("4")
+    assert inv.with_nodes("node-3", "node-4") == []
+    assert "STARTED" not in inv.states
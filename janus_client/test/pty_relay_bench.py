@@ -0,0 +1,133 @@
+"""
+Throughput benchmark for the januscli ssh_pty relay.
+
+A local python child on a pty stands in for ssh. Two directions are
+measured, each through the selector relay (januscli.relay) and through
+the loop ssh_pty used before, which wrote stdin to the pty one
+character at a time and read output in a thread that flushed every
+chunk:
+
+    output    the child writes --size bytes to its terminal
+    input     --size bytes are piped in and the child reads them in raw mode
+
+    python pty_relay_bench.py --size 4194304
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import ptyprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "cli"))
+from januscli.relay import relay
+
+WRITER = """
+import os, sys
+n = {size}
+chunk = b"x" * 65535 + b"\\n"
+while n > 0:
+    n -= os.write(1, chunk[:n])
+"""
+
+READER = """
+import os, sys, tty
+tty.setraw(0)
+os.write(1, b"R")
+n = {size}
+while n > 0:
+    n -= len(os.read(0, 65536))
+os.write(1, b"done")
+"""
+
+
+def spawn(script, size, cls=ptyprocess.PtyProcess):
+    proc = cls.spawn([sys.executable, "-c", script.format(size=size)], echo=False)
+    if script is READER:
+        # input sent before the child's terminal is raw would hit the
+        # canonical mode line limit
+        while "R" not in str(proc.read(1)):
+            pass
+    return proc
+
+
+def feeder(size):
+    '''Read end of a pipe that size bytes of input are written into.'''
+    r, w = os.pipe()
+
+    def run():
+        data = b"y" * 65536
+        left = size
+        while left > 0:
+            left -= os.write(w, data[:left])
+        os.close(w)
+    threading.Thread(target=run, daemon=True).start()
+    return r
+
+
+def run_relay(script, size, feed):
+    proc = spawn(script, size)
+    src = feeder(size) if feed else None
+    sink = os.open(os.devnull, os.O_WRONLY)
+    t = time.perf_counter()
+    relay(proc.fd, src, sink)
+    t = time.perf_counter() - t
+    proc.close(force=True)
+    if src is not None:
+        os.close(src)
+    os.close(sink)
+    return t
+
+
+def run_legacy(script, size, feed):
+    # ssh_pty before: text mode, a reader thread and read(1)/write(1)
+    proc = spawn(script, size, ptyprocess.PtyProcessUnicode)
+    src = os.fdopen(feeder(size) if feed else os.open(os.devnull, os.O_RDONLY))
+    sink = open(os.devnull, "w")
+
+    def output_reader():
+        while True:
+            try:
+                sink.write(proc.read())
+                sink.flush()
+            except EOFError:
+                break
+
+    t = time.perf_counter()
+    reader = threading.Thread(target=output_reader)
+    reader.start()
+    while feed:
+        s = src.read(1)
+        if s == '' or not proc.isalive():
+            break
+        proc.write(s)
+    reader.join()
+    t = time.perf_counter() - t
+    proc.close(force=True)
+    src.close()
+    sink.close()
+    return t
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--input-size", type=int, default=512 * 1024,
+                        help="bytes for the input direction (the old loop is slow)")
+    args = parser.parse_args()
+
+    print(f"{'direction': <10}{'MiB': >8}{'legacy s': >12}{'relay s': >12}"
+          f"{'legacy MiB/s': >15}{'relay MiB/s': >15}")
+    for name,script,size,feed in (("output", WRITER, args.size, False),
+                                  ("input", READER, args.input_size, True)):
+        legacy = run_legacy(script, size, feed)
+        new = run_relay(script, size, feed)
+        mib = size / 1024 / 1024
+        print(f"{name: <10}{mib: >8.1f}{legacy: >12.3f}{new: >12.3f}"
+              f"{mib / legacy: >15.1f}{mib / new: >15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import time
+import pytest
+import requests
+from fake_controller import API_PREFIX
+from janus_client import Client, RetryPolicy, CircuitBreaker, CircuitOpenError
+
+
+def test_retry_idempotent_only(fake_controller, make_client):
+    retry = RetryPolicy(retries=3, backoff=0.01)
+    client = make_client(retry=retry)
+    fake_controller.error_rate = 1
+    assert client.nodes().status_code == 503
+    assert fake_controller.hits[("GET", f"{API_PREFIX}/nodes")] == 4
+    assert client.create([]).status_code == 503
+    assert fake_controller.hits[("POST", f"{API_PREFIX}/create")] == 1
+
+
+def test_retry_recovers(fake_controller, make_client):
+    retry = RetryPolicy(retries=20, backoff=0.001, max_backoff=0.005)
+    client = make_client(retry=retry)
+    fake_controller.error_rate = 0.5
+    assert not client.nodes().error()
+
+
+def test_retry_connection_error():
+    retry = RetryPolicy(retries=2, backoff=0.01)
+    client = Client("http://127.0.0.1:1", auth=("admin", "admin"), retry=retry)
+    t = time.time()
+    with pytest.raises(Exception):
+        client.nodes()
+    assert time.time() - t < 1
+
+
+def test_circuit_breaker(fake_controller, make_client):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.2)
+    client = make_client(breaker=breaker)
+    fake_controller.error_rate = 1
+    client.nodes()
+    client.nodes()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.nodes()
+    assert fake_controller.hits[("GET", f"{API_PREFIX}/nodes")] == 2
+
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    fake_controller.error_rate = 0
+    assert not client.nodes().error()
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_trial_error(fake_controller, make_client, monkeypatch):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.1)
+    client = make_client(breaker=breaker)
+    fake_controller.error_rate = 1
+    client.nodes()
+    assert breaker.state == "open"
+    time.sleep(0.15)
+    send = client._send
+
+    def broken(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("connection dropped")
+
+    # a non-transient failure of the trial call re-opens the circuit
+    monkeypatch.setattr(client, "_send", broken)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.nodes()
+    assert breaker.state == "open"
+    monkeypatch.setattr(client, "_send", send)
+    fake_controller.error_rate = 0
+    time.sleep(0.15)
+    assert not client.nodes().error()
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_stream(fake_controller, make_client):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.1)
+    client = make_client(breaker=breaker)
+    aid = next(iter(client.create([{"instances": ["node-0"], "image": "dtnaas/tools",
+                                    "profile": "default", "kwargs": {}}]).json()))
+    fake_controller.error_rate = 1
+    client.nodes()
+    assert breaker.state == "open"
+    time.sleep(0.15)
+    fake_controller.error_rate = 0
+    # the log stream is the half-open trial, and closes the circuit
+    assert list(client.stream_logs(aid, "node-0"))
+    assert breaker.state == "closed"
+    assert not client.nodes().error()
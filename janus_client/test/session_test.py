@@ -0,0 +1,96 @@
+import time
+import pytest
+from janus_client import Service, Session, SessionError
+
+
+class StubResponse(object):
+    def __init__(self, data, code=200):
+        self._json = data
+        self.status_code = code
+
+    def json(self):
+        return self._json
+
+    def error(self):
+        return self.status_code > 400
+
+
+class StubClient(object):
+    def __init__(self, fail=(), delay=0, keep=()):
+        self.fail = fail
+        self.delay = delay
+        # allocations that fail to delete
+        self.keep = keep
+
+    def _op(self, k, state):
+        time.sleep(self.delay)
+        if k in self.fail:
+            return StubResponse({"error": f"{k} failed"}, 500)
+        return StubResponse({k: {"id": k, "state": state}})
+
+    def start(self, k):
+        return self._op(k, "STARTED")
+
+    def stop(self, k):
+        return self._op(k, "STOPPED")
+
+    def delete(self, k):
+        if k in self.keep:
+            return StubResponse({"error": f"{k} busy"}, 500)
+        return self._op(k, "DESTROYED")
+
+    def create(self, reqs):
+        return self._op(reqs[0]["instances"][0], "INITIALIZED")
+
+
+def stub_session(client, n, workers):
+    manifest = {str(i): {"request": []} for i in range(n)}
+    sess = Session(client, workers=workers)
+    sess._manifest.update(manifest)
+    sess._state = "INITIALIZED"
+    return sess
+
+
+def test_session_start_concurrent():
+    sess = stub_session(StubClient(delay=0.1), 8, workers=8)
+    t = time.time()
+    ret = sess.start()
+    assert time.time() - t < 0.5
+    assert not ret.error()
+    assert sorted(ret.results) == [str(i) for i in range(8)]
+    assert sess._state == "STARTED"
+
+
+def test_session_partial_failure():
+    sess = stub_session(StubClient(fail=("1", "3")), 5, workers=4)
+    with pytest.raises(SessionError) as e:
+        sess.stop()
+    ret = e.value.response
+    assert sorted(ret.errors) == ["1", "3"]
+    assert sorted(ret.results) == ["0", "2", "4"]
+    assert sess._state == "STOPPED"
+
+
+def test_session_sequential_aggregates():
+    sess = stub_session(StubClient(fail=("0",)), 3, workers=1)
+    with pytest.raises(SessionError) as e:
+        sess.destroy()
+    assert sorted(e.value.response.results) == ["1", "2"]
+
+
+def test_session_chunk_rollback():
+    client = StubClient(fail=("n2",), keep=("n0",))
+    sess = Session(client, workers=4, chunk_size=1)
+    sess.addService(Service(instances=["n0", "n1", "n2"], image="dtnaas/tools"))
+    with pytest.raises(SessionError) as e:
+        sess.initialize()
+    # n1 was deleted again, n0 is left on the controller
+    assert sorted(e.value.rollback.results) == ["n1"]
+    assert e.value.orphaned == ["n0"]
+    assert "could not roll back n0" in str(e.value)
+
+
+def test_session_chunk_workers(client):
+    assert client.getSession(chunk_size=4).workers > 1
+    assert client.getSession(chunk_size=4, workers=2).workers == 2
+    assert client.getSession().workers == 1
@@ -0,0 +1,56 @@
+import os
+import shlex
+import subprocess
+from janus_client.sshmux import SSHMux
+
+
+def test_ssh_args_share_master():
+    mux = SSHMux(persist=30)
+    try:
+        a = mux.ssh_args("node-1", 30001, "janus", "uname -a", flags=["-t"])
+        assert a[:2] == ["ssh", "-t"]
+        assert "ControlMaster=auto" in a and "ControlPersist=30" in a
+        assert a[-5:] == ["-l", "janus", "node-1", "uname", "-a"]
+        # one control socket per (host, port, user)
+        path = mux.control_path("node-1", 30001, "janus")
+        assert f"ControlPath={path}" in a
+        assert mux.control_path("node-1", "30001", "janus") == path
+        assert mux.control_path("node-1", 30002, "janus") != path
+        assert mux.control_path("node-1", 30001, "root") != path
+        assert len(path) < 100
+        assert os.stat(mux.control_dir).st_mode & 0o077 == 0
+
+        scp = mux.scp_args("node-1", 30001, "janus", ["a", "b"], "/config/", keypath="k")
+        assert scp[0] == "scp" and f"ControlPath={path}" in scp
+        assert scp[-5:] == ["-P", "30001", "a", "b", "janus@node-1:/config/"]
+
+        line = mux.ssh_command("node-1", 30001, "janus", "xfer_test -s")
+        assert shlex.split(line) == mux.ssh_args("node-1", 30001, "janus", "xfer_test -s")
+    finally:
+        mux.close()
+
+
+def test_close_removes_sockets():
+    mux = SSHMux()
+    path = mux.control_path("127.0.0.1", 1, "nobody")
+    d = mux.control_dir
+    # a stale socket file, as left by a master that has gone away
+    open(path, "w").close()
+    assert mux.masters() == []
+    mux.close()
+    assert not os.path.exists(d)
+    assert mux.control_dir is None
+
+
+def test_close_keeps_sessions(monkeypatch):
+    ops = list()
+
+    def run(args, **kwargs):
+        ops.append(args[args.index("-O") + 1])
+        return subprocess.CompletedProcess(args, 0)
+    monkeypatch.setattr(subprocess, "run", run)
+    mux = SSHMux()
+    open(mux.control_path("node-1", 30001, "janus"), "w").close()
+    mux.close()
+    # sessions still running through the master must not be cut off
+    assert ops == ["stop"]
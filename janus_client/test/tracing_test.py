@@ -0,0 +1,89 @@
+import json
+import asyncio
+import pytest
+from janus_client import Client, Service, Tracer, JsonlExporter
+from janus_client.tracing import current_span
+
+
+def test_session_span_tree(make_client, make_session, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(JsonlExporter(str(path)))
+    seen = list()
+    tracer.on_request(lambda span, op, url, hdrs: dict(hdrs or {}, traceparent=span.trace_id))
+    tracer.on_response(lambda span, res: seen.append(span.attrs.get("status")))
+    client = make_client(tracer=tracer)
+    sess = make_session(client, [f"node-{i}" for i in range(4)],
+                        workers=4, chunk_size=2)
+    sess.start()
+    sess.stop()
+
+    lines = [ json.loads(l) for l in path.read_text().splitlines() ]
+    assert [ t["name"] for t in lines ] == ["session.start", "session.stop"]
+    start = lines[0]
+    assert [ c["name"] for c in start["children"] ] == \
+        ["session.initialize", "PUT /start/{id}", "PUT /start/{id}"]
+    # the chunks are created in worker threads but still nest under the phase
+    create = start["children"][0]["children"]
+    assert [ c["name"] for c in create ] == ["POST /create", "POST /create"]
+    assert create[0]["parent_id"] == start["children"][0]["span_id"]
+    assert create[0]["trace_id"] == start["trace_id"]
+    assert create[0]["attrs"]["status"] == 200
+    assert [ c["name"] for c in lines[1]["children"] ] == ["PUT /stop/{id}"] * 2
+    assert seen == [200] * 6
+
+
+def test_untraced_errors_and_spans(fake_controller, make_client, make_session):
+    class Exported(list):
+        export = list.append
+
+    out = Exported()
+    client = make_client(tracer=Tracer(out))
+    sess = make_session(client, ["no-such-node"])
+    with pytest.raises(Exception):
+        sess.initialize()
+    assert out[0].name == "session.initialize"
+    assert out[0].error
+    assert out[0].children[0].attrs["status"] == 404
+    # disabled tracing leaves the client as it was
+    assert Client(fake_controller.url).tracer is None
+
+
+def test_async_spans(make_async_client):
+    pytest.importorskip("aiohttp")
+
+    class Exported(list):
+        export = list.append
+
+    out = Exported()
+
+    async def run():
+        async with make_async_client(tracer=Tracer(out)) as client:
+            sess = await client.getSession()
+            sess.addService(Service(instances=["node-1", "node-2"], image="dtnaas/tools",
+                                    profile="default"))
+            await sess.start()
+
+    asyncio.run(run())
+    assert [ s.name for s in out ] == ["session.start"]
+    assert [ c.name for c in out[0].children ] == ["session.initialize", "PUT /start/{id}"]
+
+
+def test_failing_hooks_finish_spans(make_client):
+    class Exported(list):
+        export = list.append
+
+    out = Exported()
+    tracer = Tracer(out)
+    client = make_client(tracer=tracer)
+    broken = tracer.on_request(lambda span, op, url, hdrs: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        client.nodes()
+    tracer.request_hooks.remove(broken)
+    tracer.on_response(lambda span, res: {}["missing"])
+    with pytest.raises(KeyError):
+        client.nodes()
+    # both spans were finished and nothing is left as the current span
+    assert [ s.name for s in out ] == ["GET /nodes", "GET /nodes"]
+    assert "ZeroDivisionError" in out[0].error and "KeyError" in out[1].error
+    assert out[1].attrs["status"] == 200
+    assert current_span() is None
@@ -0,0 +1,50 @@
+"""
+Compare per-call connections against the pooled keep-alive transport.
+
+Runs N GET /nodes calls against a local stand-in controller, once with
+keepalive disabled (a new TCP/TLS connection per call, as the client used
+to do) and once with the pooled transport.
+
+    python transport_bench.py -n 500
+    python transport_bench.py -n 500 --cert cert.pem --key key.pem
+"""
+
+import ssl
+import time
+import argparse
+from janus_client import Client
+from fake_controller import FakeController
+
+
+def run(url, n, **kwargs):
+    with Client(url, auth=("admin", "admin"), **kwargs) as client:
+        start = time.perf_counter()
+        for _ in range(n):
+            client.nodes().json()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=500)
+    parser.add_argument("--cert")
+    parser.add_argument("--key")
+    args = parser.parse_args()
+
+    ctx = None
+    if args.cert:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(args.cert, args.key)
+
+    with FakeController(ssl_context=ctx) as fc:
+        closed = run(fc.url, args.n, keepalive=False)
+        pooled = run(fc.url, args.n)
+
+    print(f"{'transport': <12}{'total (s)': >12}{'req/s': >12}")
+    for name, t in (("per-call", closed), ("pooled", pooled)):
+        print(f"{name: <12}{t: >12.3f}{args.n / t: >12.1f}")
+    print(f"speedup: {closed / pooled:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import socket
+import asyncio
+import threading
+import pytest
+from fake_controller import API_PREFIX
+from janus_client import Service, SessionError
+
+
+def set_state_later(fc, aids, state, delay):
+    def run():
+        for aid in aids:
+            fc.state.set_state(int(aid), state)
+    t = threading.Timer(delay, run)
+    t.start()
+    return t
+
+
+def test_wait_until(fake_controller, client, make_session):
+    sess = make_session(client, ["node-1"], initialize=True)
+    set_state_later(fake_controller, list(sess._manifest), "STARTED", 0.3)
+    ret = sess.wait_until("STARTED", timeout=5)
+    assert [ a["state"] for a in ret.json() ] == ["STARTED"]
+    assert sess._state == "STARTED"
+
+
+def test_wait_all_bulk(fake_controller, client, make_session):
+    sessions = [ make_session(client, [f"node-{i}"], initialize=True) for i in range(5) ]
+    aids = [ k for s in sessions for k in s._manifest ]
+    set_state_later(fake_controller, aids, "STARTED", 0.3)
+    allocs = client.wait_all(sessions, "STARTED", timeout=5)
+    assert sorted(allocs) == sorted(aids)
+    # one listing per poll rather than one GET per allocation
+    assert fake_controller.hits[("GET", f"{API_PREFIX}/active")] <= 10
+    assert not any(p.startswith(f"{API_PREFIX}/active/") for m,p in fake_controller.hits)
+
+
+def test_wait_timeout_and_missing(fake_controller, client, make_session):
+    sess = make_session(client, ["node-2"], initialize=True)
+    with pytest.raises(TimeoutError):
+        sess.wait_until("STARTED", timeout=0.2)
+    fake_controller.state.active.clear()
+    with pytest.raises(SessionError):
+        sess.wait_until("STARTED", timeout=1)
+
+
+def test_wait_probe(fake_controller, client, make_session):
+    sess = make_session(client, ["node-3"], initialize=True)
+    aid = next(iter(sess._manifest))
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    svc = fake_controller.state.active[int(aid)]["services"]["node-3"][0]
+    svc["ctrl_host"] = "127.0.0.1"
+    svc["ctrl_port"] = str(srv.getsockname()[1])
+    fake_controller.state.set_state(int(aid), "STARTED")
+    # started but nothing is listening yet
+    with pytest.raises(TimeoutError):
+        sess.wait_until("STARTED", timeout=0.3, probe=True, probe_timeout=0.1)
+    srv.listen()
+    try:
+        assert sess.wait_until("STARTED", timeout=2, probe=True)
+    finally:
+        srv.close()
+
+
+def test_async_wait_until(fake_controller, make_async_client):
+    pytest.importorskip("aiohttp")
+
+    async def run():
+        async with make_async_client() as client:
+            sess = await client.getSession()
+            sess.addService(Service(instances=["node-4"], image="dtnaas/tools",
+                                    profile="default"))
+            await sess.initialize()
+            set_state_later(fake_controller, list(sess._manifest), "STARTED", 0.2)
+            return await sess.wait_until("STARTED", timeout=5)
+
+    ret = asyncio.run(run())
+    assert ret.json()[0]["state"] == "STARTED"
@@ -0,0 +1,170 @@
+import json
+import time
+import uuid
+import inspect
+import threading
+import functools
+import contextvars
+
+_current = contextvars.ContextVar("janus_span", default=None)
+
+
+class Span(object):
+    __slots__ = ("name", "trace_id", "span_id", "parent", "start", "duration",
+                 "attrs", "error", "children", "_t0", "_token")
+
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start = time.time()
+        self.duration = None
+        self.attrs = attrs
+        self.error = None
+        self.children = list()
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def json(self):
+        return {"name": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent.span_id if self.parent else None,
+                "start": self.start,
+                "duration": self.duration,
+                "attrs": self.attrs,
+                "error": self.error,
+                "children": [ c.json() for c in self.children ]}
+
+
+class JsonlExporter(object):
+    '''Appends each finished trace, as one span tree per line, to path.'''
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.json(), default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class Tracer(object):
+    '''Span tracing for Client calls and Session phases.
+
+    The current span is kept in a context variable, so spans nest across
+    awaits and, through propagate(), in worker threads. When a root span
+    finishes the whole tree is handed to exporter.export(). Request hooks
+    fn(span, op, url, hdrs) run before every controller call and may
+    return replacement headers; response hooks fn(span, res) get the
+    response or the exception raised. A hook that raises fails the call,
+    and its span is finished with the hook's error.
+    '''
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self.request_hooks = list()
+        self.response_hooks = list()
+
+    def on_request(self, fn):
+        self.request_hooks.append(fn)
+        return fn
+
+    def on_response(self, fn):
+        self.response_hooks.append(fn)
+        return fn
+
+    def start(self, name, **attrs):
+        span = Span(name, _current.get(), **attrs)
+        span._token = _current.set(span)
+        return span
+
+    def finish(self, span, error=None):
+        span.duration = time.perf_counter() - span._t0
+        if error is not None:
+            span.error = repr(error)
+        _current.reset(span._token)
+        if span.parent:
+            span.parent.children.append(span)
+        elif self.exporter is not None:
+            self.exporter.export(span)
+
+    def span(self, name, **attrs):
+        return _SpanContext(self, name, attrs)
+
+    def request(self, span, op, url, hdrs):
+        '''Run the request hooks, finishing span if one raises.'''
+        try:
+            for fn in self.request_hooks:
+                hdrs = fn(span, op, url, hdrs) or hdrs
+        except Exception as e:
+            self.finish(span, e)
+            raise
+        return hdrs
+
+    def response(self, span, res, error=None):
+        '''Run the response hooks and finish span, whether or not one
+        of them raises.'''
+        try:
+            for fn in self.response_hooks:
+                fn(span, res)
+        except Exception as e:
+            error = e if error is None else error
+            raise
+        finally:
+            self.finish(span, error)
+
+
+class _SpanContext(object):
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.span = self.tracer.start(self.name, **self.attrs)
+        return self.span
+
+    def __exit__(self, typ, exc, tb):
+        self.tracer.finish(self.span, exc)
+
+
+def current_span():
+    return _current.get()
+
+
+def propagate(fn):
+    '''fn run in a copy of the caller's context, so spans it starts in a
+    worker thread nest under the current span. Returns fn itself when
+    there is no current span.'''
+    if _current.get() is None:
+        return fn
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def traced(name):
+    '''Decorator for Session methods: a span named name around the call
+    when the session's client has a tracer, a plain call otherwise (also
+    for client stand-ins without a tracer attribute).'''
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def acall(self, *args, **kwargs):
+                tracer = getattr(self._client, "tracer", None)
+                if tracer is None:
+                    return await fn(self, *args, **kwargs)
+                with tracer.span(name, session=str(self._id)):
+                    return await fn(self, *args, **kwargs)
+            return acall
+
+        @functools.wraps(fn)
+        def call(self, *args, **kwargs):
+            tracer = getattr(self._client, "tracer", None)
+            if tracer is None:
+                return fn(self, *args, **kwargs)
+            with tracer.span(name, session=str(self._id)):
+                return fn(self, *args, **kwargs)
+        return call
+    return wrap
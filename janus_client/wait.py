@@ -0,0 +1,197 @@
+import time
+
+
+class Backoff(object):
+    '''Adaptive poll interval: starts at initial and grows by factor up
+    to maximum, dropping back to initial when reset() sees progress.'''
+    def __init__(self, initial=0.05, maximum=2.0, factor=2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.current = initial
+
+    def next(self):
+        ret = self.current
+        self.current = min(self.maximum, self.current * self.factor)
+        return ret
+
+    def reset(self):
+        self.current = self.initial
+
+
+class ExecResult(object):
+    def __init__(self, node, exec_id):
+        self.node = node
+        self.exec_id = exec_id
+        self.exit_code = None
+        self.output = ""
+        self.running = True
+        self.error = None
+        self.polls = 0
+        self.started = time.monotonic()
+        self.elapsed = None
+
+    def __str__(self):
+        if self.error:
+            state = f"error: {self.error}"
+        elif self.running:
+            state = "timed out"
+        else:
+            state = f"exit {self.exit_code}"
+        return f"{self.node}/{self.exec_id}: {state} ({self.elapsed:.2f}s)"
+
+    @property
+    def timed_out(self):
+        return self.running and self.error is None
+
+    @property
+    def ok(self):
+        return not self.running and self.error is None and self.exit_code == 0
+
+    def json(self):
+        return {"node": self.node,
+                "exec_id": self.exec_id,
+                "exit_code": self.exit_code,
+                "output": self.output,
+                "running": self.running,
+                "error": self.error,
+                "elapsed": self.elapsed}
+
+
+class ExecWaiter(object):
+    '''Polling schedule for a set of (node, exec_id) pairs.
+
+    Each exec backs off independently between interval and max_interval,
+    and snaps back to interval whenever new output shows up. budget caps
+    the total number of status requests per second across all of them.
+    The waiter does no I/O: a driver asks due() what to poll, feeds the
+    answers to update() and sleeps for wait_time(), until done.
+    '''
+    def __init__(self, targets, timeout=None, callback=None, interval=0.05,
+                 max_interval=2.0, budget=None):
+        now = time.monotonic()
+        self.results = { t: ExecResult(*t) for t in targets }
+        self._pending = { t: [Backoff(interval, max_interval), now] for t in self.results }
+        self._deadline = None if timeout is None else now + timeout
+        self._callback = callback
+        self._budget = budget
+        self._tokens = max(1, budget) if budget else budget
+        self._refilled = now
+
+    @property
+    def done(self):
+        return not self._pending
+
+    def _finish(self, target, now):
+        res = self.results[target]
+        res.elapsed = now - res.started
+        del self._pending[target]
+
+    def due(self):
+        now = time.monotonic()
+        if self._deadline is not None and now >= self._deadline:
+            for t in list(self._pending):
+                self._finish(t, now)
+            return []
+        ready = sorted((d, t) for t,(b,d) in self._pending.items() if d <= now)
+        if self._budget:
+            # the bucket holds at least one request, or a budget below one
+            # per second could never send any
+            self._tokens = min(max(1, self._budget),
+                               self._tokens + (now - self._refilled) * self._budget)
+            self._refilled = now
+            ready = ready[:int(self._tokens)]
+            self._tokens -= len(ready)
+        return [ t for d,t in ready ]
+
+    def update(self, target, ret):
+        '''Record one exec_status answer (a Response or an exception).'''
+        now = time.monotonic()
+        res = self.results[target]
+        res.polls += 1
+        backoff = self._pending[target][0]
+        if isinstance(ret, Exception) or ret.error():
+            res.error = str(ret)
+            res.running = False
+            return self._finish(target, now)
+        status = ret.json() or {}
+        output = status.get("output") or ""
+        if len(output) > len(res.output):
+            if self._callback:
+                self._callback(res.node, res.exec_id, output[len(res.output):])
+            res.output = output
+            backoff.reset()
+        if not status.get("Running", status.get("running", False)):
+            res.exit_code = status.get("ExitCode", status.get("exit_code"))
+            res.running = False
+            return self._finish(target, now)
+        self._pending[target][1] = now + backoff.next()
+
+    def wait_time(self):
+        if not self._pending:
+            return 0
+        now = time.monotonic()
+        wake = min(d for b,d in self._pending.values())
+        if self._budget and self._tokens < 1:
+            wake = max(wake, now + (1 - self._tokens) / self._budget)
+        if self._deadline is not None:
+            wake = min(wake, self._deadline)
+        return max(0, wake - now)
+
+
+class StateWaiter(object):
+    '''Tracks allocations until they all report state.
+
+    Fed one bulk active() listing per poll by update(), it returns the
+    allocations that have just reached state, and a driver marks them
+    ready() (optionally after probing them). The poll interval backs off
+    while nothing changes and resets when any watched allocation moves.
+    Allocations that disappear from the listing are recorded in missing.
+    Like ExecWaiter, it does no I/O.
+    '''
+    def __init__(self, ids, state, timeout=None, interval=0.1, max_interval=5.0):
+        self.state = state
+        self.pending = { str(i) for i in ids }
+        self.missing = set()
+        self.allocations = dict()
+        self.polls = 0
+        self._backoff = Backoff(interval, max_interval)
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+
+    @property
+    def done(self):
+        return not self.pending
+
+    @property
+    def expired(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def update(self, allocs):
+        self.polls += 1
+        byid = { str(a['id']): a for a in allocs if 'id' in a }
+        moved = False
+        reached = list()
+        for aid in list(self.pending):
+            alloc = byid.get(aid)
+            if alloc is None:
+                self.missing.add(aid)
+                self.pending.discard(aid)
+                continue
+            prev = self.allocations.get(aid)
+            if prev is None or prev.get('state') != alloc.get('state'):
+                moved = True
+            self.allocations[aid] = alloc
+            if alloc.get('state') == self.state:
+                reached.append(alloc)
+        if moved:
+            self._backoff.reset()
+        return reached
+
+    def ready(self, aid):
+        self.pending.discard(str(aid))
+
+    def wait_time(self):
+        delay = self._backoff.next()
+        if self._deadline is not None:
+            delay = min(delay, max(0, self._deadline - time.monotonic()))
+        return delay
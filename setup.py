@@ -25,4 +25,9 @@ setup(
     packages=find_packages(),
 
     install_requires=['requests'],
+
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+    },
 )